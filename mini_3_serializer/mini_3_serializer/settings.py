@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -81,9 +82,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # a file, not the default shared-cache in-memory database: concurrent connections
+        # then wait for each other's locks (busy timeout) instead of failing with 'table is locked'
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# tuned profile, used when DB_TUNED=1: connections stay open between requests (seconds, checked
+# before reuse) and new SQLite connections get the SQLITE_PRAGMAS below. off by default, every
+# request then opens a fresh connection with SQLite's own settings.
+DB_TUNED = os.environ.get('DB_TUNED') == '1'
+if DB_TUNED:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# optional local PostgreSQL, used when POSTGRES_DB is set (needs psycopg installed).
+# Django 4.2 has no pool of its own: connections persist per worker thread through CONN_MAX_AGE,
+# POSTGRES_PGBOUNCER=1 is for running behind PgBouncer in transaction pooling mode.
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', ''),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        # server-side cursors (QuerySet.iterator) do not survive transaction pooling
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POSTGRES_PGBOUNCER') == '1',
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -118,6 +149,30 @@ USE_TZ = True
 AUTH_USER_MODEL = 'profile_1.MyUser'
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# the local-memory backend evicts least recently used entries once MAX_ENTRIES is reached
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'representations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'representations',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+REPRESENTATION_CACHE_ALIAS = 'representations'
+
+REPRESENTATION_CACHE_TIMEOUT = 300
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
@@ -127,3 +182,85 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Serializer tracing and profiling
+# start_end_log only wraps serializer hooks when SERIALIZER_TRACE or SERIALIZER_PROFILE is on;
+# spans are buffered in memory and flushed to the 'profile_1.trace' logger in batches,
+# latency histograms are served by /profile-1/serializer-profile/.
+
+SERIALIZER_TRACE = False
+
+SERIALIZER_PROFILE = False
+
+SERIALIZER_TRACE_BUFFER_SIZE = 4096
+
+SERIALIZER_TRACE_FLUSH_SIZE = 256
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'profile_1': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+        },
+    },
+}
+
+
+# Django REST framework
+# JSON through orjson when it is installed (pip install orjson), the stdlib json module otherwise.
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'profile_1.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'profile_1.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+
+# Bulk user creation (UserSerializer(many=True).save())
+
+USER_BULK_CREATE_BATCH_SIZE = 1000
+
+# lines validated and committed together by the NDJSON import endpoint (/profile-1/user-import/)
+USER_IMPORT_BATCH_SIZE = 1000
+
+# memoized run_validation results per field of serializers with MemoizedValidationMixin (ProfileSerializer)
+VALIDATION_CACHE_SIZE = 1024
+
+# usernames per IN query when a list of users is checked for duplicates
+USER_UNIQUE_CHECK_CHUNK_SIZE = 500
+
+# hash passwords of bulk imports in a process pool with this many workers (0 or 1 = serial)
+PASSWORD_HASH_WORKERS = 0
+
+# smaller batches are hashed serially, the pool round trip is not worth it
+PASSWORD_HASH_PARALLEL_MIN = 16
+
+
+# SQLite connection tuning of the DB_TUNED profile, applied to every new connection (profile_1.db.set_sqlite_pragmas).
+# WAL lets readers run while one connection writes, NORMAL sync is durable across crashes of the
+# process (only a power loss can drop the last commits), writers wait up to busy_timeout ms for the lock.
+# WAL is stored in the database file: it stays on after switching the profile off.
+
+TUNED_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 2**20,
+    'cache_size': -64 * 2**10,  # KiB
+}
+
+SQLITE_PRAGMAS = TUNED_SQLITE_PRAGMAS if DB_TUNED else {}
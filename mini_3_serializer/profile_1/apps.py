@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class Profile1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'profile_1'
+
+    def ready(self):
+        import profile_1.signals  # noqa: F401
+        from profile_1.db import set_sqlite_pragmas
+
+        connection_created.connect(set_sqlite_pragmas, dispatch_uid='profile_1.set_sqlite_pragmas')
@@ -0,0 +1,102 @@
+import gc
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from profile_1.models import MyUser
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run a benchmark against a throwaway test database, never against the real one,
+    with the same environment as the test runner (DEBUG off, 'testserver' allowed).
+    """
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_users(count, batch_size=10000, prefix='user', start=0):
+    """
+    Insert users `start` to `count` with profiles (no usable password, hashing is not what we measure).
+    """
+    for batch_start in range(start, count, batch_size):
+        MyUser.objects.bulk_create_users(
+            {
+                'username': f'{prefix}{i}',
+                'first_name': f'first name {i}',
+                'last_name': f'last name {i}',
+                'birthdate': f'{1950 + i % 60}-{1 + i % 12:02}-{1 + i % 28:02}',
+            }
+            for i in range(batch_start, min(count, batch_start + batch_size))
+        )
+
+
+def seed_friendships(pks, degree, seed=0, batch_size=10000):
+    """
+    Random symmetric friendships, about `degree` friends per user.
+    both directions are inserted, like MyUser.friends.add does for a symmetrical relation.
+    """
+    rng = random.Random(seed)
+    through = MyUser.friends.through
+    pairs = set()
+    for pk in pks:
+        for friend_pk in rng.sample(pks, degree // 2):
+            if friend_pk != pk:
+                pairs.add((pk, friend_pk))
+                pairs.add((friend_pk, pk))
+    rows = [through(from_myuser_id=pk, to_myuser_id=friend_pk) for pk, friend_pk in pairs]
+    through.objects.bulk_create(rows, batch_size=batch_size)
+    return len(pairs)
+
+
+def measure(func, repeat=5):
+    """
+    Best wall time of `repeat` calls, in seconds.
+    garbage left by the previous call is collected before each one, outside the timing.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def count_queries(func):
+    """
+    Number of queries `func()` runs (all of them, connection.queries keeps only the last 9000).
+    """
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        func()
+    return count
+
+
+def peak_memory(func):
+    """
+    Peak of the memory allocated by python while `func()` runs, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
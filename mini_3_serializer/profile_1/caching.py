@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.relations import Hyperlink
+from rest_framework.settings import api_settings
+
+from profile_1.fieldsets import field_selection_key
+
+
+def get_cache():
+    return caches[getattr(settings, 'REPRESENTATION_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'REPRESENTATION_CACHE_TIMEOUT', 300)
+
+
+def version_key(pk):
+    return f'repr:version:{pk}'
+
+
+def new_version():
+    return time.time_ns()
+
+
+def invalidate_representations(pks):
+    """
+    Give the users a new version stamp, every cached representation of them is stale from now on.
+    """
+    get_cache().set_many({version_key(pk): new_version() for pk in pks}, timeout=None)
+
+
+def get_versions(pks):
+    """
+    Current version stamp per user pk. users without one (never cached or evicted) get a fresh stamp,
+    never a default, so a fragment stored before an eviction can not come back.
+    """
+    cache = get_cache()
+    stored = cache.get_many([version_key(pk) for pk in pks])
+    versions = {}
+    missing = {}
+    for pk in pks:
+        version = stored.get(version_key(pk))
+        if version is None:
+            version = missing[version_key(pk)] = new_version()
+        versions[pk] = version
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return versions
+
+
+def get_key_prefix(serializer_class, context):
+    prefix = f'repr:{serializer_class.__module__}.{serializer_class.__qualname__}'
+    request = context.get('request')
+    if request is not None:
+        # hyperlinked fields render absolute urls
+        prefix = f'{prefix}:{request.build_absolute_uri("/")}'
+        # and keep ?format= on them
+        url_format = request.query_params.get(api_settings.URL_FORMAT_OVERRIDE)
+        if url_format:
+            prefix = f'{prefix}:format={url_format}'
+    if context.get('native_dates'):
+        prefix = f'{prefix}:native'
+    if context.get('fields') is not None:
+        prefix = f'{prefix}:fields={field_selection_key(context["fields"])}'
+    return prefix
+
+
+def to_plain(value):
+    """
+    A representation without DRF's wrappers, to keep cache entries small: a Hyperlink pickles the whole
+    model instance it points to (password hash included), ReturnDict / ReturnList their serializer.
+    """
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    if isinstance(value, Hyperlink):
+        return str(value)
+    return value
+
+
+def cached_representations(serializer_class, context, pks, load_instances):
+    """
+    Representations of the given user pks, in order. only the cache misses are loaded
+    (through `load_instances(pks)`) and serialized, then stored for the next request.
+    """
+    cache = get_cache()
+    versions = get_versions(pks)
+    prefix = get_key_prefix(serializer_class, context)
+    keys = {pk: f'{prefix}:{pk}:{versions[pk]}' for pk in pks}
+
+    fragments = cache.get_many(list(keys.values()))
+    missing = [pk for pk in pks if keys[pk] not in fragments]
+    if missing:
+        instances = list(load_instances(missing))
+        data = serializer_class(instances, many=True, context=context).data
+        fresh = {keys[instance.pk]: to_plain(item) for instance, item in zip(instances, data)}
+        cache.set_many(fresh, timeout=get_timeout())
+        fragments.update(fresh)
+    return [fragments[keys[pk]] for pk in pks if keys[pk] in fragments]
@@ -0,0 +1,150 @@
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from profile_1.fieldsets import field_selection_key
+
+# field types whose to_representation is a plain type conversion
+FAST_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+    serializers.URLField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+}
+
+_compiled = {}
+
+
+def get_converter(field):
+    converter = FAST_CONVERTERS.get(type(field))
+    if converter is not None:
+        return converter
+    if type(field) is serializers.DateField:
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is not None and output_format.lower() == ISO_8601:
+            return lambda value: value.isoformat() if value else None
+    return field.to_representation
+
+
+def get_model_field(model, field):
+    """
+    Walk field.source through the model relations and return the last model field.
+    """
+    model_field = None
+    for attr in field.source_attrs:
+        if model_field is not None:
+            if not model_field.is_relation or model_field.many_to_many or model_field.one_to_many:
+                break
+            model = model_field.related_model
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+    else:
+        return model_field
+    raise ImproperlyConfigured(
+        f'{field.parent.__class__.__name__}.{field.field_name}: source {field.source!r} '
+        f'is not a model column, it can not be compiled.'
+    )
+
+
+def get_field(serializer, field_path):
+    field = serializer
+    for field_name in field_path:
+        field = field.fields[field_name]
+    return field
+
+
+def compile_fields(serializer, model, prefix, field_path, pk_index, paths, namespace, batches):
+    """
+    Append the values_list() paths for the serializer's readable fields to `paths`
+    and return the source of a dict expression that builds its representation from `row`.
+    batch-loaded fields (`batch_load(pks)` returning {pk: value}) are looked up by the row's pk
+    (`row[pk_index]`), their loads are collected in `batches` and run once per list
+    on the field of the serializer being rendered, so they see its context.
+    """
+    items = []
+    for field in serializer._readable_fields:
+        if hasattr(field, 'batch_load'):
+            index = len(batches)
+            batches.append((field_path + (field.field_name,), pk_index))
+            items.append(f'{field.field_name!r}: batch_{index}[row[{pk_index}]]')
+            continue
+        unsupported = (
+            serializers.ListSerializer, serializers.ManyRelatedField, serializers.RelatedField,
+            serializers.SerializerMethodField, serializers.HiddenField,
+        )
+        if isinstance(field, unsupported) or field.source == '*':
+            raise ImproperlyConfigured(
+                f'{serializer.__class__.__name__}.{field.field_name}: '
+                f'{field.__class__.__name__} is not supported by the compiled representation.'
+            )
+        model_field = get_model_field(model, field)
+        path = prefix + '__'.join(field.source_attrs)
+        if isinstance(field, serializers.BaseSerializer):
+            if not model_field.is_relation:
+                raise ImproperlyConfigured(
+                    f'{serializer.__class__.__name__}.{field.field_name}: nested serializer needs a relation.'
+                )
+            related_model = model_field.related_model
+            nested_pk_index = len(paths)
+            paths.append(f'{path}__{related_model._meta.pk.name}')
+            nested = compile_fields(
+                field, related_model, f'{path}__', field_path + (field.field_name,), nested_pk_index,
+                paths, namespace, batches,
+            )
+            items.append(f'{field.field_name!r}: None if row[{nested_pk_index}] is None else {nested}')
+        else:
+            index = len(paths)
+            paths.append(path)
+            namespace[f'convert_{index}'] = get_converter(field)
+            items.append(f'{field.field_name!r}: None if row[{index}] is None else convert_{index}(row[{index}])')
+    return '{' + ', '.join(items) + '}'
+
+
+def compile_serializer(serializer_class, fields=None, native_dates=False):
+    """
+    Generate (once per serializer class, field selection and native_dates flag) a function that turns values_list() rows into the
+    same dicts the serializer's to_representation would return, without loading model instances.
+    custom output logic is only honoured when it lives in `finalize_representation(data)`.
+    returns (values_list paths, function(serializer, rows)).
+    """
+    key = (serializer_class, field_selection_key(fields), native_dates)
+    compiled = _compiled.get(key)
+    if compiled is not None:
+        return compiled
+
+    paths = ['pk']
+    namespace = {'get_field': get_field}
+    batches = []
+    # the converters are taken from this serializer, it needs the context options that change fields
+    serializer = serializer_class(context={'fields': fields, 'native_dates': native_dates})
+    row_dict = compile_fields(serializer, serializer_class.Meta.model, '', (), 0, paths, namespace, batches)
+    lines = []
+    if batches:
+        lines.append('rows = list(rows)')
+    for index, (field_path, pk_index) in enumerate(batches):
+        lines.append(
+            f'batch_{index} = get_field(serializer, {field_path!r})'
+            f'.batch_load([row[{pk_index}] for row in rows if row[{pk_index}] is not None])'
+        )
+    if hasattr(serializer_class, 'finalize_representation'):
+        lines.append('finalize = serializer.finalize_representation')
+        lines.append(f'return [finalize({row_dict}) for row in rows]')
+    else:
+        lines.append(f'return [{row_dict} for row in rows]')
+    source = 'def represent(serializer, rows):\n' + ''.join(f'    {line}\n' for line in lines)
+    exec(compile(source, f'<compiled {serializer_class.__name__}>', 'exec'), namespace)
+
+    compiled = (paths, namespace['represent'])
+    _compiled[key] = compiled
+    return compiled
+
+
+def compiled_to_representation(serializer, queryset):
+    fields = serializer.get_field_selection() if hasattr(serializer, 'get_field_selection') else None
+    native_dates = bool(serializer.context.get('native_dates'))
+    paths, represent = compile_serializer(type(serializer), fields, native_dates)
+    return represent(serializer, queryset.values_list(*paths))
@@ -0,0 +1,12 @@
+from django.conf import settings
+
+
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to a new SQLite connection, on the raw connection so they stay out of query logs.
+    connected to connection_created in Profile1Config.ready.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
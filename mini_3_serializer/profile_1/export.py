@@ -0,0 +1,168 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from profile_1.compiled import get_converter, get_model_field
+
+
+def get_export_columns(serializer, prefix='', path_prefix=''):
+    """
+    (column name, values_list path, field, model field) for the serializer's readable model columns, in field order.
+    nested serializers are flattened into 'nested.field' columns. fields that are not a model column
+    (source '*', batch-loaded lists, method fields, to-many relations) have no column and are skipped.
+    """
+    columns = []
+    for field in serializer._readable_fields:
+        if field.source == '*' or isinstance(field, (
+            serializers.ListSerializer, serializers.ManyRelatedField, serializers.SerializerMethodField,
+        )):
+            continue
+        try:
+            model_field = get_model_field(serializer.Meta.model, field)
+        except ImproperlyConfigured:
+            continue
+        path = path_prefix + '__'.join(field.source_attrs)
+        if isinstance(field, serializers.BaseSerializer):
+            columns += get_export_columns(field, f'{prefix}{field.field_name}.', f'{path}__')
+        elif not model_field.many_to_many and not model_field.one_to_many:
+            columns.append((prefix + field.field_name, path, field, model_field))
+    return columns
+
+
+def iter_column_chunks(queryset, paths, chunk_size):
+    """
+    Yield the queryset's values as columns (one list per path), `chunk_size` rows at a time.
+    """
+    rows = queryset.values_list(*paths).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield [list(column) for column in zip(*chunk)]
+
+
+def to_text_columns(columns, fields):
+    """
+    Columns converted like the serializer fields render them (e.g. dates as ISO 8601 strings), None kept.
+    """
+    converted = []
+    for column, field in zip(columns, fields):
+        convert = get_converter(field)
+        converted.append([None if value is None else convert(value) for value in column])
+    return converted
+
+
+class CSVWriter:
+    """
+    Writers take the output file and the columns of get_export_columns, then write(columns) per chunk.
+    """
+    binary = False
+
+    def __init__(self, file, columns):
+        self.writer = csv.writer(file)
+        self.writer.writerow([name for name, _, _, _ in columns])
+        self.fields = [field for _, _, field, _ in columns]
+
+    def write(self, columns):
+        self.writer.writerows(zip(*to_text_columns(columns, self.fields)))
+
+    def close(self):
+        pass
+
+
+class NDJSONWriter:
+    binary = False
+
+    def __init__(self, file, columns):
+        self.file = file
+        # every line is '{"name":value,...}', the keys are encoded once
+        self.keys = [json.dumps(name) + ':' for name, _, _, _ in columns]
+        self.fields = [field for _, _, field, _ in columns]
+        self.encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def write(self, columns):
+        encoded = [list(map(self.encode, column)) for column in to_text_columns(columns, self.fields)]
+        self.file.writelines(
+            '{' + ','.join(key + value for key, value in zip(self.keys, row)) + '}\n'
+            for row in zip(*encoded)
+        )
+
+    def close(self):
+        pass
+
+
+# Django field type -> pyarrow type name, so a chunk of only NULLs still gets the column's type
+ARROW_TYPES = {
+    'AutoField': 'int64',
+    'BigAutoField': 'int64',
+    'BigIntegerField': 'int64',
+    'BooleanField': 'bool_',
+    'CharField': 'string',
+    'DateField': 'date32',
+    'FloatField': 'float64',
+    'IntegerField': 'int64',
+    'PositiveIntegerField': 'int64',
+    'PositiveSmallIntegerField': 'int64',
+    'SlugField': 'string',
+    'SmallIntegerField': 'int64',
+    'TextField': 'string',
+}
+
+
+class ArrowWriter:
+    """
+    Columns as Arrow arrays, one record batch / row group per chunk. needs pyarrow.
+    values keep their python types (dates stay dates), other column types are inferred from the data.
+    """
+    binary = True
+
+    def __init__(self, file, columns):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImproperlyConfigured('Parquet and Arrow exports need pyarrow (pip install pyarrow).')
+        self.pyarrow = pyarrow
+        self.file = file
+        self.names = [name for name, _, _, _ in columns]
+        self.types = [ARROW_TYPES.get(model_field.get_internal_type()) for _, _, _, model_field in columns]
+        self.writer = None
+
+    def write(self, columns):
+        arrays = [
+            self.pyarrow.array(column, type=getattr(self.pyarrow, type_name)() if type_name else None)
+            for column, type_name in zip(columns, self.types)
+        ]
+        table = self.pyarrow.Table.from_arrays(arrays, names=self.names)
+        if self.writer is None:
+            self.writer = self.open(table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            self.write([[] for _ in self.names])
+        self.writer.close()
+
+    def open(self, schema):
+        raise NotImplementedError('`open()` must be implemented.')
+
+
+class ParquetWriter(ArrowWriter):
+    def open(self, schema):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(self.file, schema)
+
+
+class ArrowFileWriter(ArrowWriter):
+    def open(self, schema):
+        return self.pyarrow.ipc.new_file(self.file, schema)
+
+
+WRITERS = {
+    'csv': CSVWriter,
+    'ndjson': NDJSONWriter,
+    'parquet': ParquetWriter,
+    'arrow': ArrowFileWriter,
+}
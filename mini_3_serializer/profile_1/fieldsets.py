@@ -0,0 +1,55 @@
+from rest_framework import serializers
+
+
+def parse_field_selection(value):
+    """
+    A `?fields=` value as a selection tree: 'username,my_profile.birthdate' -> {'username': None, 'my_profile': {'birthdate': None}}.
+    None selects a field with everything below it. an empty value selects everything (returns None).
+    """
+    selection = {}
+    for path in value.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = selection
+        for name in names[:-1]:
+            if node.get(name, {}) is None:
+                # 'my_profile' already selects all of it
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return selection or None
+
+
+def field_selection_key(selection):
+    """
+    Canonical string of a selection tree, for cache keys. None (everything) is ''.
+    """
+    if selection is None:
+        return ''
+    return ','.join(
+        name if selection[name] is None else f'{name}({field_selection_key(selection[name])})'
+        for name in sorted(selection)
+    )
+
+
+def get_unknown_fields(serializer, selection, prefix=''):
+    """
+    Paths of the selection that are not readable fields of the serializer.
+    """
+    unknown = []
+    for name, nested in selection.items():
+        field = serializer.fields.get(name)
+        if field is None or field.write_only:
+            unknown.append(prefix + name)
+            continue
+        if nested is None:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        if isinstance(field, serializers.BaseSerializer):
+            unknown += get_unknown_fields(field, nested, f'{prefix}{name}.')
+        else:
+            unknown += [f'{prefix}{name}.{nested_name}' for nested_name in nested]
+    return unknown
@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# one pool per worker count, kept alive between requests so workers are only spawned once
+_executors = {}
+
+
+def get_hash_workers():
+    return getattr(settings, 'PASSWORD_HASH_WORKERS', 0)
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def get_executor(workers):
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # spawn instead of fork: the serving process is usually multi-threaded
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'mini_3_serializer.settings'),),
+        )
+        _executors[workers] = executor
+    return executor
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
+
+
+def make_passwords(raw_passwords, workers=None, parallel_min=None):
+    """
+    Hash many passwords, in a process pool when PASSWORD_HASH_WORKERS > 1.
+    every password still gets its own salt, so the result is the same as calling make_password in a loop.
+    """
+    raw_passwords = list(raw_passwords)
+    if workers is None:
+        workers = get_hash_workers()
+    if parallel_min is None:
+        parallel_min = getattr(settings, 'PASSWORD_HASH_PARALLEL_MIN', 16)
+    if workers <= 1 or len(raw_passwords) < parallel_min:
+        return [make_password(raw_password) for raw_password in raw_passwords]
+    chunksize = max(1, len(raw_passwords) // (workers * 4))
+    return list(get_executor(workers).map(make_password, raw_passwords, chunksize=chunksize))
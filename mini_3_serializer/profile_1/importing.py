@@ -0,0 +1,116 @@
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.settings import api_settings
+
+from profile_1.serializers import UserSerializer
+from profile_1.streaming import aiter_sync, get_json_encoder
+
+
+# sent for every line of a batch whose insert still conflicted after a retry
+CONFLICT_ERROR = 'Conflicting concurrent write, the batch was rolled back. Send these lines again.'
+
+
+class LengthRequired(APIException):
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = 'A Content-Length header is required.'
+    default_code = 'length_required'
+
+
+def get_import_batch_size():
+    return getattr(settings, 'USER_IMPORT_BATCH_SIZE', 1000)
+
+
+def iter_lines(stream, skip=0):
+    """
+    (line number, parsed item or None, parse error or None) for every non-blank line of an NDJSON stream,
+    read one line at a time. the first `skip` lines are read but not parsed.
+    """
+    for number, line in enumerate(stream, start=1):
+        if number <= skip or not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as exc:
+            yield number, None, f'Invalid JSON: {exc}'
+
+
+def import_batch(batch, context, attempts=2):
+    """
+    Validate a batch of (line number, item) with UserSerializer and create the valid users in one transaction.
+    returns the created users and {line number: errors} of the invalid items.
+    when a concurrent import inserts the same usernames in between, the insert fails (IntegrityError)
+    and the batch is validated again, which reports those usernames as taken.
+    """
+    for attempt in range(attempts):
+        serializer = UserSerializer(data=[item for _, item in batch], many=True, context=context)
+        results, errors = serializer.validate_items(serializer.initial_data)
+        failed = {number: item_errors for (number, _), item_errors in zip(batch, errors) if item_errors}
+        valid = [validated for validated in results if validated is not None]
+        try:
+            users = serializer.create(valid) if valid else []
+        except IntegrityError:
+            if attempt + 1 == attempts:
+                raise
+            continue
+        return users, failed
+
+
+def iter_import_results(stream, context, batch_size, skip=0, verbose=False):
+    """
+    Import users from an NDJSON stream batch by batch and yield NDJSON result records:
+    {"line": n, "errors": {...}} for every rejected line ({"line": n, "id": pk} for created ones when verbose),
+    then {"committed": n, ...} once the batch up to line n is committed. a failed import is resumed
+    by sending the same file again with skip=<last committed line>.
+    only one batch of lines is held in memory.
+    """
+    encoder = get_json_encoder()
+    lines = iter_lines(stream, skip)
+    created = failed = 0
+    committed = skip
+    while True:
+        chunk = list(islice(lines, batch_size))
+        if not chunk:
+            break
+        records = []
+        batch = []
+        for number, item, parse_error in chunk:
+            if parse_error is not None:
+                records.append({'line': number, 'errors': {api_settings.NON_FIELD_ERRORS_KEY: [parse_error]}})
+            else:
+                batch.append((number, item))
+        try:
+            users, errors = import_batch(batch, context) if batch else ([], {})
+        except IntegrityError:
+            users = []
+            errors = {number: {api_settings.NON_FIELD_ERRORS_KEY: [CONFLICT_ERROR]} for number, _ in batch}
+        records += [{'line': number, 'errors': item_errors} for number, item_errors in errors.items()]
+        if verbose:
+            valid_lines = [number for number, _ in batch if number not in errors]
+            records += [{'line': number, 'id': user.pk} for number, user in zip(valid_lines, users)]
+        records.sort(key=lambda record: record['line'])
+        created += len(users)
+        failed += len(chunk) - len(users)
+        committed = chunk[-1][0]
+        records.append({'committed': committed, 'created': created, 'failed': failed})
+        yield ''.join(encoder.encode(record) + '\n' for record in records)
+    yield encoder.encode({'done': True, 'committed': committed, 'created': created, 'failed': failed}) + '\n'
+
+
+def streaming_import_response(request, context, batch_size, skip=0, verbose=False):
+    # DRF has no stream without a Content-Length (e.g. chunked uploads) or for an empty body
+    stream = request.stream
+    if stream is None:
+        if 'CONTENT_LENGTH' not in request.META:
+            raise LengthRequired()
+        raise ParseError('The request body is empty.')
+    content = iter_import_results(stream, context, batch_size, skip, verbose)
+    if isinstance(request._request, ASGIRequest):
+        content = aiter_sync(content)
+    return StreamingHttpResponse(content, content_type='application/x-ndjson')
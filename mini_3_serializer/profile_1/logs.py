@@ -1,15 +1,164 @@
-from rest_framework.decorators import api_view
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque, namedtuple
+from functools import wraps
+
+from django.conf import settings
+
+logger = logging.getLogger('profile_1.trace')
+
+Span = namedtuple('Span', ['name', 'tag', 'depth', 'thread', 'start', 'duration'])
+
+_local = threading.local()
+_spans = deque(maxlen=getattr(settings, 'SERIALIZER_TRACE_BUFFER_SIZE', 4096))
+_flush_lock = threading.Lock()
+
+# histogram bucket upper bounds in seconds: 1us, 2us, 4us, ... ~16s
+HISTOGRAM_BOUNDS = [2 ** i / 1_000_000 for i in range(25)]
+
+_hook_stats = {}
+_hook_stats_lock = threading.Lock()
+
+
+def tracing_enabled():
+    return getattr(settings, 'SERIALIZER_TRACE', False)
+
+
+def profiling_enabled():
+    return getattr(settings, 'SERIALIZER_PROFILE', False)
+
+
+class HookStats:
+    """
+    Call count, total time and a log2 latency histogram for one serializer hook.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.lock = threading.Lock()
+
+    def record(self, duration):
+        index = bisect_left(HISTOGRAM_BOUNDS, duration)
+        with self.lock:
+            self.count += 1
+            self.total += duration
+            self.buckets[index] += 1
+            if duration > self.max:
+                self.max = duration
+
+    def percentile(self, percent):
+        """
+        Upper bound of the bucket holding the given percentile, capped at the slowest call.
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                if index < len(HISTOGRAM_BOUNDS):
+                    return min(HISTOGRAM_BOUNDS[index], self.max)
+                return self.max
+        return self.max
+
+
+def get_hook_stats(serializer_name, tag, hook_name):
+    key = (serializer_name, tag, hook_name)
+    stats = _hook_stats.get(key)
+    if stats is None:
+        with _hook_stats_lock:
+            stats = _hook_stats.setdefault(key, HookStats())
+    return stats
+
+
+def profile_report():
+    """
+    Aggregated per-hook latencies, hottest hooks (by total time) first.
+    """
+    report = []
+    for (serializer_name, tag, hook_name), stats in list(_hook_stats.items()):
+        if not stats.count:
+            continue
+        report.append({
+            'serializer': serializer_name,
+            'tag': tag,
+            'hook': hook_name,
+            'count': stats.count,
+            'total_ms': round(stats.total * 1000, 3),
+            'mean_ms': round(stats.total / stats.count * 1000, 3),
+            'p50_ms': round(stats.percentile(50) * 1000, 3),
+            'p95_ms': round(stats.percentile(95) * 1000, 3),
+            'p99_ms': round(stats.percentile(99) * 1000, 3),
+            'max_ms': round(stats.max * 1000, 3),
+        })
+    report.sort(key=lambda row: row['total_ms'], reverse=True)
+    return report
+
+
+def reset_profile():
+    with _hook_stats_lock:
+        _hook_stats.clear()
+
+
+def format_span(span):
+    return f'{span.depth * "  "}[{span.name} - {span.tag}] {span.duration * 1000:.3f}ms'
+
+
+def flush_spans():
+    """
+    Pop every buffered span and write them to the trace logger as one batch.
+    """
+    batch = []
+    with _flush_lock:
+        while _spans:
+            try:
+                batch.append(_spans.popleft())
+            except IndexError:
+                break
+    if batch:
+        batch.sort(key=lambda span: (span.thread, span.start))
+        logger.debug('\n'.join(format_span(span) for span in batch))
+    return batch
 
 
 def start_end_log(func):
+    """
+    Record a span and/or a latency sample for every call of the decorated serializer hook.
+    When both tracing and profiling are disabled the hook is returned untouched, so it costs nothing.
+    a span is indented one level below the traced call it runs in, or by its `level_log` level when
+    it is outside any traced call.
+    """
+    trace = tracing_enabled()
+    profile = profiling_enabled()
+    if not trace and not profile:
+        return func
+
+    flush_size = getattr(settings, 'SERIALIZER_TRACE_FLUSH_SIZE', 256)
+
+    @wraps(func)
     def inner(self, *args, **kwargs):
-        log_message = getattr(func, 'log_message', '')
-        log_level = getattr(func, 'log_level', 0)
-        log_level_spaces = log_level * '  '
-        print(f'{log_level_spaces}+++[{func.__name__} - {log_message}]')
-        result = func(self, *args, **kwargs)
-        print(f'{log_level_spaces}---[{func.__name__} - {log_message}]')
-        return result
+        tag = getattr(func, 'log_message', '')
+        outer_depth = getattr(_local, 'depth', 0)
+        depth = outer_depth or getattr(func, 'log_level', 0)
+        _local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            _local.depth = outer_depth
+            if profile:
+                get_hook_stats(type(self).__name__, tag, func.__name__).record(duration)
+            if trace:
+                _spans.append(Span(func.__name__, tag, depth, threading.get_ident(), start, duration))
+                if not outer_depth and len(_spans) >= flush_size:
+                    flush_spans()
     return inner
 
 
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profile_1.benchmarks import benchmark_database, seed_users
+from profile_1.models import MyUser
+from profile_1.views import UserHyperLinkViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the sync (/test5/) and async (/test5-async/) user endpoints under uvicorn, '
+        'reporting requests per second. needs uvicorn installed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario')
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('bench_asgi needs uvicorn (pip install uvicorn).')
+        with benchmark_database():
+            seed_users(options['users'])
+            pk = MyUser.objects.order_by('pk').values_list('pk', flat=True).first()
+            # compare the stacks, not the representation cache
+            UserHyperLinkViewSet.cache_representations = False
+            try:
+                asyncio.run(self.run(uvicorn, pk, options['concurrency'], options['duration']))
+            finally:
+                UserHyperLinkViewSet.cache_representations = True
+
+    async def run(self, uvicorn, pk, concurrency, duration):
+        from mini_3_serializer.asgi import application
+
+        server = uvicorn.Server(uvicorn.Config(application, host='127.0.0.1', port=0, lifespan='off', log_level='warning'))
+        serve = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        self.stdout.write(f'{"scenario":<22} {"sync req/s":>11} {"async req/s":>12} {"ratio":>7}')
+        for name, path in [('list, 100 per page', '/'), ('retrieve', f'/{pk}/')]:
+            sync = await self.load(port, f'/profile-1/test5{path}', concurrency, duration)
+            async_ = await self.load(port, f'/profile-1/test5-async{path}', concurrency, duration)
+            self.stdout.write(f'{name:<22} {sync:>11.0f} {async_:>12.0f} {async_ / sync:>6.2f}x')
+
+        server.should_exit = True
+        await serve
+
+    async def load(self, port, path, concurrency, duration):
+        """
+        Requests per second of `concurrency` keep-alive connections sending GET `path` for `duration` seconds.
+        """
+        deadline = time.perf_counter() + duration
+        request = f'GET {path} HTTP/1.1\r\nHost: testserver\r\n\r\n'.encode()
+
+        async def client():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            done = 0
+            while time.perf_counter() < deadline:
+                writer.write(request)
+                status = await reader.readline()
+                if not status.startswith(b'HTTP/1.1 200'):
+                    raise CommandError(f'{path}: {status.decode().strip()}')
+                length = 0
+                while (line := await reader.readline()) != b'\r\n':
+                    name, _, value = line.decode('latin-1').partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                await reader.readexactly(length)
+                done += 1
+            writer.close()
+            await writer.wait_closed()
+            return done
+
+        start = time.perf_counter()
+        done = await asyncio.gather(*(client() for _ in range(concurrency)))
+        return sum(done) / (time.perf_counter() - start)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import override_settings
+
+from profile_1.benchmarks import benchmark_database
+from profile_1.serializers import UserSerializer
+
+# what a connection gets without SQLITE_PRAGMAS (journal_mode has to be reset explicitly, WAL is stored in the file)
+SQLITE_DEFAULTS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Threads creating users through UserSerializer at the same time, '
+        'with SQLite defaults and with settings.TUNED_SQLITE_PRAGMAS. reports users/s and failed writes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--users', type=int, default=200, help='users created per thread')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f'{connection.vendor}: the PRAGMA profile only applies to SQLite')
+        with benchmark_database(), override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            self.stdout.write(f'{"profile":<16} {"users/s":>9} {"failed":>7}')
+            for name, pragmas in [('sqlite defaults', SQLITE_DEFAULTS), ('tuned', settings.TUNED_SQLITE_PRAGMAS)]:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    # the next connection of every thread runs the connection_created hook with these pragmas
+                    connections.close_all()
+                    created, failed, seconds = self.run(name, options['threads'], options['users'])
+                self.stdout.write(f'{name:<16} {created / seconds:>9.0f} {failed:>7}')
+
+    def run(self, name, threads, users):
+        barrier = threading.Barrier(threads)
+        created = []
+        failed = []
+        prefix = name.replace(' ', '_')
+
+        def writer(index):
+            barrier.wait()
+            try:
+                for i in range(users):
+                    serializer = UserSerializer(data={
+                        'username': f'{prefix}_{index}_{i}',
+                        'password': 'secret',
+                        'my_profile': {'first_name': 'first', 'birthdate': '2000-01-01'},
+                    })
+                    try:
+                        serializer.is_valid()
+                        serializer.save()
+                        created.append(1)
+                    except Exception as exc:
+                        failed.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        seconds = time.perf_counter() - start
+        for exc in {str(exc) for exc in failed}:
+            self.stdout.write(f'  {name}: {exc}')
+        return len(created), len(failed), seconds
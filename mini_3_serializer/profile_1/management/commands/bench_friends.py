@@ -0,0 +1,71 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from profile_1.benchmarks import benchmark_database, measure, seed_friendships, seed_users
+from profile_1.models import MyUser
+
+
+class Command(BaseCommand):
+    help = 'Benchmark friends-graph serialization and friend-of-friend / mutual-friend lookups on a synthetic graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--degree', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--samples', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.stdout.write(f'seeding {options["users"]} users ...')
+            seed_users(options['users'])
+            pks = list(MyUser.objects.values_list('pk', flat=True))
+            edges = seed_friendships(pks, options['degree'])
+            self.stdout.write(f'{edges} friendship rows')
+            self.run(pks, options['page_size'], options['samples'])
+
+    def report(self, name, naive, optimized):
+        self.stdout.write(f'{name:<28} {naive * 1000:>10.2f} {optimized * 1000:>10.2f} {naive / optimized:>7.1f}x')
+
+    def run(self, pks, page_size, samples):
+        rng = random.Random(1)
+        page = pks[:page_size]
+        self.stdout.write(f'{"scenario":<28} {"naive ms":>10} {"sql ms":>10} {"speedup":>8}')
+
+        def per_user_queries():
+            return {user.pk: [friend.pk for friend in user.friends.all()] for user in MyUser.objects.filter(pk__in=page)}
+
+        def prefetched():
+            users = MyUser.objects.filter(pk__in=page).prefetch_related('friends')
+            return {user.pk: [friend.pk for friend in user.friends.all()] for user in users}
+
+        batched = lambda: MyUser.objects.friend_ids(page)
+        self.report(f'friend ids, {page_size} users', measure(per_user_queries, 1), measure(batched))
+        self.report(f'  vs prefetch_related', measure(prefetched, 3), measure(batched))
+
+        users = rng.sample(pks, samples)
+
+        def python_friends_of_friends():
+            for pk in users:
+                user = MyUser.objects.prefetch_related('friends__friends').get(pk=pk)
+                friends = set(user.friends.all())
+                candidates = set()
+                for friend in friends:
+                    candidates |= set(friend.friends.all())
+                candidates -= friends | {user}
+
+        def sql_friends_of_friends():
+            for pk in users:
+                list(MyUser.objects.friends_of_friends(pk))
+
+        self.report(f'friends of friends x{samples}', measure(python_friends_of_friends, 1), measure(sql_friends_of_friends, 3))
+
+        def python_mutual_friends():
+            for pk, other_pk in zip(users, reversed(users)):
+                set(MyUser.objects.get(pk=pk).friends.all()) & set(MyUser.objects.get(pk=other_pk).friends.all())
+
+        def sql_mutual_friends():
+            for pk, other_pk in zip(users, reversed(users)):
+                list(MyUser.objects.mutual_friends(pk, other_pk))
+
+        self.report(f'mutual friends x{samples}', measure(python_mutual_friends, 3), measure(sql_mutual_friends, 3))
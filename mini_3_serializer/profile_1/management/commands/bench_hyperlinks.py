@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from profile_1.benchmarks import benchmark_database, measure, seed_users
+from profile_1.models import MyUser
+from profile_1.serializers import UserHyperLinkSerializer
+
+
+class ReversingUserHyperLinkSerializer(UserHyperLinkSerializer):
+    # DRF's field, one reverse() and build_absolute_uri() per row
+    serializer_url_field = serializers.HyperlinkedIdentityField
+
+
+class Command(BaseCommand):
+    help = (
+        'Render UserHyperLinkSerializer(many=True) lists with per-row reverse() and with the cached '
+        'url template of TemplatedHyperlinkedIdentityField. reports rows/s.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_users(options['users'])
+            users = list(MyUser.objects.order_by('id'))
+            request = Request(APIRequestFactory().get('/'))
+
+            def render(serializer_class):
+                return serializer_class(users, many=True, context={'request': request}).data
+
+            if render(UserHyperLinkSerializer) != render(ReversingUserHyperLinkSerializer):
+                raise CommandError('the url template renders different urls than reverse()')
+
+            count = len(users)
+            self.stdout.write(f'{"url field":<24} {"rows/s":>9} {"speedup":>8}')
+            reversing = measure(lambda: render(ReversingUserHyperLinkSerializer), options['repeat'])
+            templated = measure(lambda: render(UserHyperLinkSerializer), options['repeat'])
+            for name, seconds in [('reverse() per row', reversing), ('url template', templated)]:
+                self.stdout.write(f'{name:<24} {count / seconds:>9.0f} {reversing / seconds:>7.2f}x')
@@ -0,0 +1,48 @@
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from profile_1.benchmarks import benchmark_database, measure, seed_users
+from profile_1.models import MyUser
+from profile_1.parsers import FastJSONParser
+from profile_1.renderers import FastJSONRenderer, orjson
+from profile_1.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Encode and decode UserSerializer(many=True) lists with the stdlib JSONRenderer / JSONParser '
+        'and with FastJSONRenderer / FastJSONParser (orjson).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', type=int, default=[1000, 100_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson is not installed, FastJSONRenderer / FastJSONParser fall back to the stdlib')
+        with benchmark_database():
+            seed_users(max(options['scales']))
+            self.stdout.write(f'{"case":<16} {"stdlib ms":>10} {"fast ms":>9} {"speedup":>8} {"MiB":>7}')
+            for scale in sorted(options['scales']):
+                data = UserSerializer(MyUser.objects.order_by('pk')[:scale], many=True).data
+                self.run(scale, data, options['repeat'])
+
+    def run(self, scale, data, repeat):
+        encoded = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != encoded:
+            raise CommandError('FastJSONRenderer output differs from JSONRenderer')
+        cases = [
+            ('encode', lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+            ('decode', lambda: JSONParser().parse(BytesIO(encoded)), lambda: FastJSONParser().parse(BytesIO(encoded))),
+        ]
+        for name, stdlib, fast in cases:
+            stdlib_seconds = measure(stdlib, repeat)
+            fast_seconds = measure(fast, repeat)
+            self.stdout.write(
+                f'{f"{name} {scale}":<16} {stdlib_seconds * 1000:>10.1f} {fast_seconds * 1000:>9.1f} '
+                f'{stdlib_seconds / fast_seconds:>7.1f}x {len(encoded) / 2**20:>7.2f}'
+            )
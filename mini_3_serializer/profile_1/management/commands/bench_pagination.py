@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import Cursor, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from profile_1.benchmarks import benchmark_database, measure, seed_users
+from profile_1.models import MyUser
+from profile_1.pagination import UserCursorPagination
+
+
+class Command(BaseCommand):
+    help = 'Compare deep-page latency of offset pagination and keyset (cursor) pagination on MyUser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--depths', nargs='+', type=float, default=[0, 0.1, 0.5, 0.9, 0.999])
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.stdout.write(f'seeding {options["users"]} users ...')
+            seed_users(options['users'])
+            self.run(options['users'], options['page_size'], options['depths'])
+
+    def run(self, users, page_size, depths):
+        factory = APIRequestFactory()
+        queryset = MyUser.objects.order_by('id')
+        ids = list(queryset.values_list('id', flat=True))
+
+        self.stdout.write(f'{"depth":>6} {"row":>9} {"offset ms":>10} {"keyset ms":>10} {"speedup":>8}')
+        for depth in depths:
+            row = min(int(users * depth), users - page_size)
+
+            offset_paginator = LimitOffsetPagination()
+            offset_request = Request(factory.get('/', {'limit': page_size, 'offset': row}))
+            offset_time = measure(lambda: offset_paginator.paginate_queryset(queryset, offset_request))
+
+            cursor_paginator = UserCursorPagination()
+            cursor_paginator.page_size = page_size
+            cursor_paginator.base_url = 'http://testserver/'
+            position = ids[row - 1] if row else 0
+            url = cursor_paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+            cursor_request = Request(factory.get(url))
+            cursor_time = measure(lambda: cursor_paginator.paginate_queryset(queryset, cursor_request))
+
+            self.stdout.write(
+                f'{depth:>6} {row:>9} {offset_time * 1000:>10.2f} {cursor_time * 1000:>10.2f} '
+                f'{offset_time / cursor_time:>7.1f}x'
+            )
@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from profile_1.hashers import get_hash_workers, make_passwords, shutdown_executors
+
+
+class Command(BaseCommand):
+    help = 'Compare serial and process-pool password hashing throughput for bulk user imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+        parser.add_argument('--workers', type=int, default=get_hash_workers() or os.cpu_count())
+        parser.add_argument(
+            '--sample', type=int, default=None,
+            help='hash at most this many passwords per run and extrapolate linearly to the full size',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        sample = options['sample']
+        # spawn the pool before timing, the way a long-running server would already have it
+        make_passwords(['warm-up'] * workers, workers=workers, parallel_min=0)
+
+        self.stdout.write(f'workers: {workers}')
+        self.stdout.write(f'{"users":>8} {"serial/s":>10} {"parallel/s":>11} {"speedup":>8} {"serial":>10} {"parallel":>10}')
+        for size in options['sizes']:
+            measured = min(size, sample) if sample else size
+            raw_passwords = [f'password-{i}' for i in range(measured)]
+            serial = self.measure(raw_passwords, 1)
+            parallel = self.measure(raw_passwords, workers)
+            note = f' (extrapolated from {measured})' if measured != size else ''
+            self.stdout.write(
+                f'{size:>8} {measured / serial:>10.1f} {measured / parallel:>11.1f} {serial / parallel:>7.2f}x '
+                f'{serial * size / measured:>9.1f}s {parallel * size / measured:>9.1f}s{note}'
+            )
+        shutdown_executors()
+
+    def measure(self, raw_passwords, workers):
+        start = time.perf_counter()
+        make_passwords(raw_passwords, workers=workers, parallel_min=0)
+        return time.perf_counter() - start
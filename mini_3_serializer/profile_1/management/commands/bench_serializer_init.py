@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from profile_1.benchmarks import benchmark_database, measure
+from profile_1.models import MyUser
+from profile_1.serializers import CachedFieldsMixin, UserSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark UserSerializer construction and is_valid() with per-instance and per-class cached fields.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            MyUser.objects.create(username='taken')
+            self.run(options['count'])
+
+    def run(self, count):
+        data = {
+            'username': 'new_user',
+            'password': 'secret',
+            'my_profile': {'first_name': 'first', 'last_name': 'last', 'birthdate': '2000-01-01'},
+        }
+
+        def construct():
+            for _ in range(count):
+                UserSerializer().fields
+
+        def validate():
+            for _ in range(count):
+                UserSerializer(data=data).is_valid()
+
+        self.stdout.write(f'{"scenario":<24} {"per instance/s":>15} {"cached/s":>10} {"speedup":>8}')
+        for name, func in [('construct + fields', construct), ('is_valid()', validate)]:
+            CachedFieldsMixin.cache_fields = False
+            try:
+                uncached = measure(func, 3)
+            finally:
+                CachedFieldsMixin.cache_fields = True
+            cached = measure(func, 3)
+            self.stdout.write(f'{name:<24} {count / uncached:>15.0f} {count / cached:>10.0f} {uncached / cached:>7.1f}x')
@@ -0,0 +1,187 @@
+import json
+import platform
+import sqlite3
+
+import django
+import rest_framework
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from profile_1.benchmarks import benchmark_database, count_queries, measure, peak_memory, seed_users
+from profile_1.models import MyUser
+from profile_1.serializers import UserHyperLinkSerializer, UserSerializer
+
+
+def rolled_back(func):
+    """
+    Run `func` in a transaction that is rolled back, so writes can be repeated on the same data.
+    """
+    def run():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+    return run
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the serializer round trips of profile_1/scripts.py (single and many=True) on a database seeded '
+        'with N users, with query counts and peak memory. --save writes a JSON baseline, '
+        '--compare checks the run against one and fails on regressions.'
+    )
+    # scripts.py payloads, usernames get an index suffix so many=True items do not collide
+    invalid_data = {'username': 'invalid_user', 'passwordd': 'invalid_user'}
+    valid_data = {
+        'username': 'invalid_user',
+        'password': 'invalid_user',
+        'my_profile': {'first_name': 'test2 first name', 'last_name': 'test2 last name', 'birthdate': '2023-09-16'},
+    }
+    create_data = {
+        'username': 'test3',
+        'password': 'test3',
+        'my_profile': {'first_name': 'test3 first name', 'birthdate': '2023-09-16'},
+    }
+    update_data = {'username': 'test4', 'my_profile': {'last_name': 'test4 last name'}}
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', type=int, default=[1, 1000, 100_000])
+        parser.add_argument('--repeat', type=int, default=5, help='timed runs per case, the best one counts')
+        parser.add_argument('--loops', type=int, default=20, help='calls per timed run of the single cases (divided by the scale for many=True)')
+        parser.add_argument('--save', help='write the results to this JSON file')
+        parser.add_argument('--compare', help='baseline JSON file to check the results against')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='allowed relative slowdown / memory growth before a case counts as a regression',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        results = {}
+        # hashing has its own benchmark (bench_password_hashing), keep it from dominating create / update
+        with benchmark_database(), override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            seeded = 0
+            for scale in sorted(options['scales']):
+                self.stdout.write(f'seeding {scale} users ...')
+                seed_users(scale, start=seeded)
+                seeded = scale
+                for name, func, number in self.get_cases(scale, options['loops']):
+                    results[name] = self.run_case(func, number, options['repeat'])
+                    self.report(name, results[name], baseline)
+
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump({'meta': self.get_meta(options), 'results': results}, file, indent=2, sort_keys=True)
+            self.stdout.write(f'saved {options["save"]}')
+        if baseline is not None:
+            regressions = self.compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+            self.stdout.write('no regressions')
+
+    def get_meta(self, options):
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'rest_framework': rest_framework.VERSION,
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'scales': options['scales'],
+            'repeat': options['repeat'],
+            'loops': options['loops'],
+        }
+
+    def get_cases(self, scale, loops):
+        """
+        (name, function, calls per function) for every scenario, single and many=True at this scale.
+        """
+        request = Request(APIRequestFactory().get('/'))
+        user = UserSerializer.setup_eager_loading(MyUser.objects.all()).get(username='user0')
+
+        def users():
+            return MyUser.objects.order_by('pk')[:scale]
+
+        def numbered(data, count, key='username'):
+            return [{**data, key: f'{data[key]}_{i}'} for i in range(count)]
+
+        scenarios = {
+            'serializing': (
+                lambda: UserSerializer(user).data,
+                lambda: UserSerializer(users(), many=True).data,
+            ),
+            'deserializing': (
+                lambda: UserSerializer(data=self.invalid_data).is_valid(),
+                lambda: UserSerializer(data=numbered(self.invalid_data, scale), many=True).is_valid(),
+            ),
+            'deserializing_valid': (
+                lambda: UserSerializer(data=self.valid_data).is_valid(),
+                lambda: UserSerializer(data=numbered(self.valid_data, scale), many=True).is_valid(),
+            ),
+            'create_user': (
+                rolled_back(lambda: self.save(UserSerializer(data=self.create_data))),
+                rolled_back(lambda: self.save(UserSerializer(data=numbered(self.create_data, scale), many=True))),
+            ),
+            'update_user': (
+                rolled_back(lambda: self.save(UserSerializer(user, data=self.update_data))),
+                rolled_back(lambda: self.save(UserSerializer(users(), data=numbered(self.update_data, scale), many=True))),
+            ),
+            'hyperlink': (
+                lambda: UserHyperLinkSerializer(user, context={'request': request}).data,
+                lambda: UserHyperLinkSerializer(users(), many=True, context={'request': request}).data,
+            ),
+        }
+        for scenario, (single, many) in scenarios.items():
+            yield f'{scenario}/single/{scale}', single, loops
+            yield f'{scenario}/many/{scale}', many, max(1, loops // scale)
+
+    def save(self, serializer):
+        if not serializer.is_valid():
+            raise CommandError(f'benchmark payload is invalid: {serializer.errors}')
+        serializer.save()
+
+    def run_case(self, func, number, repeat):
+        """
+        Seconds per call (best of `repeat` runs of `number` calls), queries and peak memory of one call.
+        """
+        def run():
+            for _ in range(number):
+                func()
+
+        return {
+            'seconds': measure(run, repeat) / number,
+            'queries': count_queries(func),
+            'peak_bytes': peak_memory(func),
+        }
+
+    def report(self, name, result, baseline):
+        line = f'{name:<34} {result["seconds"] * 1000:>11.3f} ms {result["queries"]:>7} queries {result["peak_bytes"] / 2**20:>9.2f} MiB'
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous:
+            line += f'   {result["seconds"] / previous["seconds"]:>5.2f}x time'
+        self.stdout.write(line)
+
+    def compare(self, results, baseline, tolerance):
+        """
+        Cases slower or bigger than the baseline beyond `tolerance`, or running more queries.
+        """
+        regressions = []
+        for name, previous in baseline['results'].items():
+            result = results.get(name)
+            if result is None:
+                continue
+            reasons = []
+            if result['seconds'] > previous['seconds'] * (1 + tolerance):
+                reasons.append(f'time {result["seconds"] / previous["seconds"]:.2f}x')
+            if result['queries'] > previous['queries']:
+                reasons.append(f'queries {previous["queries"]} -> {result["queries"]}')
+            if result['peak_bytes'] > previous['peak_bytes'] * (1 + tolerance):
+                reasons.append(f'memory {result["peak_bytes"] / previous["peak_bytes"]:.2f}x')
+            if reasons:
+                regressions.append(f'{name} ({", ".join(reasons)})')
+        return regressions
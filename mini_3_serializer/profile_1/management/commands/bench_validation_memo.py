@@ -0,0 +1,69 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from profile_1.benchmarks import measure
+from profile_1.serializers import ProfileSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Validate a bulk ProfileSerializer(many=True) payload with repeated names and birthdates, '
+        'with and without memoized field validation. reports items/s and the cache hits per field.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000)
+        parser.add_argument('--first-names', type=int, default=200, help='distinct first names')
+        parser.add_argument('--last-names', type=int, default=2000, help='distinct last names')
+        parser.add_argument('--birthdates', type=int, default=800, help='distinct birthdates')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        data = self.get_payload(options)
+
+        def validate():
+            serializer = ProfileSerializer(data=data, many=True)
+            serializer.is_valid(raise_exception=True)
+
+        count = options['count']
+        ProfileSerializer.memoize_validation = False
+        try:
+            plain = measure(validate, options['repeat'])
+        finally:
+            ProfileSerializer.memoize_validation = True
+        ProfileSerializer.clear_validation_cache()
+        start = time.perf_counter()
+        validate()
+        cold = time.perf_counter() - start
+        info = ProfileSerializer.validation_cache_info()
+        warm = measure(validate, options['repeat'])
+
+        self.stdout.write(f'{"scenario":<22} {"items/s":>9} {"speedup":>8}')
+        for name, seconds in [('not memoized', plain), ('memoized, cold cache', cold), ('memoized, warm cache', warm)]:
+            self.stdout.write(f'{name:<22} {count / seconds:>9.0f} {plain / seconds:>7.2f}x')
+        self.stdout.write('cold cache, per field:')
+        for field_name, field_info in info.items():
+            ratio = field_info.hits / ((field_info.hits + field_info.misses) or 1)
+            self.stdout.write(f'  {field_name:<12} {field_info.hits:>7} hits {field_info.misses:>7} misses {ratio:>6.1%}')
+
+    def get_payload(self, options):
+        """
+        Profiles drawn from small pools with a skewed (1 / rank) distribution, like a real import
+        where a few names and dates are very common.
+        """
+        rng = random.Random(options['seed'])
+        start = date(1960, 1, 1)
+        pools = {
+            'first_name': [f'first name {i}' for i in range(options['first_names'])],
+            'last_name': [f'last name {i}' for i in range(options['last_names'])],
+            'birthdate': [(start + timedelta(days=rng.randrange(40 * 365))).isoformat() for _ in range(options['birthdates'])],
+        }
+        columns = {
+            field_name: rng.choices(pool, weights=[1 / rank for rank in range(1, len(pool) + 1)], k=options['count'])
+            for field_name, pool in pools.items()
+        }
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
@@ -0,0 +1,55 @@
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from profile_1.benchmarks import benchmark_database, measure, seed_users
+from profile_1.models import MyUser
+from profile_1.parsers import FastJSONParser, MessagePackParser
+from profile_1.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from profile_1.serializers import UserSerializer
+from profile_1.views import to_columns
+
+
+class Command(BaseCommand):
+    help = (
+        'Payload size, encode and decode time of UserSerializer(many=True) lists as JSON (stdlib and orjson) '
+        'and MessagePack, one object per row and in the ?shape=columns layout. needs msgpack.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', type=int, default=[1000, 100_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if msgpack is None:
+            raise CommandError('bench_wire_formats needs msgpack (pip install msgpack).')
+        with benchmark_database():
+            seed_users(max(options['scales']))
+            self.stdout.write(f'{"format":<26} {"KiB":>10} {"size":>6} {"encode ms":>10} {"decode ms":>10}')
+            for scale in sorted(options['scales']):
+                users = MyUser.objects.order_by('pk')[:scale]
+                data = UserSerializer(users, many=True).data
+                native = UserSerializer(users, many=True, context={'native_dates': True}).data
+                self.stdout.write(f'{scale} users')
+                self.run(data, native, options['repeat'])
+
+    def run(self, data, native, repeat):
+        formats = [
+            ('json (stdlib)', JSONRenderer(), JSONParser(), data),
+            ('json (orjson)', FastJSONRenderer(), FastJSONParser(), data),
+            ('msgpack', MessagePackRenderer(), MessagePackParser(), native),
+        ]
+        baseline = None
+        for name, renderer, parser, payload in formats:
+            for shape, shaped in [('rows', payload), ('columns', to_columns(payload))]:
+                encoded = renderer.render(shaped)
+                if baseline is None:
+                    baseline = len(encoded)
+                encode = measure(lambda: renderer.render(shaped), repeat)
+                decode = measure(lambda: parser.parse(BytesIO(encoded)), repeat)
+                self.stdout.write(
+                    f'  {f"{name}, {shape}":<24} {len(encoded) / 1024:>10.1f} {len(encoded) / baseline:>6.0%} '
+                    f'{encode * 1000:>10.1f} {decode * 1000:>10.1f}'
+                )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from profile_1.export import WRITERS, get_export_columns, iter_column_chunks
+from profile_1.models import MyUser
+from profile_1.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Export users and their profiles as CSV, NDJSON, Parquet or Arrow, with the columns of UserSerializer '
+        '(write-only and computed fields left out), reading .values_list() chunks instead of model instances.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+        parser.add_argument('--output', default='-', help="file to write, '-' for stdout (text formats only)")
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        writer_class = WRITERS[options['format']]
+        columns = get_export_columns(UserSerializer())
+        if options['output'] == '-':
+            if writer_class.binary:
+                raise CommandError(f'{options["format"]} is a binary format, pass --output.')
+            file = self.stdout
+        else:
+            file = open(options['output'], 'wb' if writer_class.binary else 'w', newline=None if writer_class.binary else '')
+
+        start = time.perf_counter()
+        rows = 0
+        try:
+            writer = writer_class(file, columns)
+            queryset = MyUser.objects.order_by('pk')
+            for chunk in iter_column_chunks(queryset, [path for _, path, _, _ in columns], options['chunk_size']):
+                writer.write(chunk)
+                rows += len(chunk[0])
+            writer.close()
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        finally:
+            if file is not self.stdout:
+                file.close()
+        seconds = time.perf_counter() - start
+        self.stderr.write(f'{rows} rows in {seconds:.2f}s, {rows / seconds if seconds else 0:.0f} rows/s')
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:03
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def store_image_dimensions(apps, schema_editor):
+    MyImage = apps.get_model('profile_1', 'MyImage')
+    images = MyImage.objects.filter(width__isnull=True).exclude(image='').values_list('pk', 'image')
+    for pk, name in images:
+        try:
+            with default_storage.open(name) as file:
+                width, height = get_image_dimensions(file)
+        except OSError:
+            continue
+        MyImage.objects.filter(pk=pk).update(width=width, height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profile_1', '0002_alter_myuser_friends'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='myimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='myimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='myimage',
+            name='image',
+            field=models.ImageField(height_field='height', upload_to='', width_field='width'),
+        ),
+        migrations.RunPython(store_image_dimensions, migrations.RunPython.noop),
+    ]
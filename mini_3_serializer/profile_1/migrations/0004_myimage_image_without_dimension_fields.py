@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profile_1', '0003_myimage_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='myimage',
+            name='image',
+            field=models.ImageField(upload_to=''),
+        ),
+    ]
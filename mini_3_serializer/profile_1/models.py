@@ -1,5 +1,11 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count
+
+from profile_1.hashers import make_passwords
 
 
 class MyUserManager(UserManager):
@@ -15,11 +21,137 @@ class MyUserManager(UserManager):
         MyProfile(my_user=my_user, first_name=first_name, last_name=last_name, birthdate=birthdate).save()
         return my_user
 
+    async def acreate_user(self, username, email=None, password=None, **extra_fields):
+        """
+        Async create_user, through the async ORM. the password is hashed in a worker thread
+        (it is CPU bound and would block the event loop). the returned user has its profile cached,
+        so it can be serialized without a synchronous query.
+        """
+        if not username:
+            raise ValueError('The given username must be set')
+        profile_data = {key: extra_fields.pop(key, None) for key in ['first_name', 'last_name', 'birthdate']}
+        extra_fields.setdefault('is_staff', False)
+        extra_fields.setdefault('is_superuser', False)
+        user = self.model(username=self.model.normalize_username(username), email=self.normalize_email(email), **extra_fields)
+        user.password = await sync_to_async(make_password, thread_sensitive=False)(password)
+        await user.asave(using=self._db)
+        user.my_profile = await MyProfile.objects.acreate(my_user=user, **profile_data)
+        return user
+
+    def bulk_create_users(self, users_data, batch_size=None):
+        """
+        Create users and their profiles with one bulk INSERT per model (per batch)
+        inside a single transaction. each item takes the same keys as create_user.
+        passwords are hashed up front, in a process pool when PASSWORD_HASH_WORKERS > 1.
+        relies on the backend returning primary keys from bulk inserts (SQLite 3.35+, PostgreSQL).
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'USER_BULK_CREATE_BATCH_SIZE', 1000)
+        users, profiles_data = self.build_users(users_data)
+        with transaction.atomic(using=self.db):
+            users = self.bulk_create(users, batch_size=batch_size)
+            MyProfile.objects.using(self.db).bulk_create(
+                [MyProfile(my_user=user, **profile_data) for user, profile_data in zip(users, profiles_data)],
+                batch_size=batch_size,
+            )
+        return users
+
+    def build_users(self, users_data):
+        """
+        Unsaved users with hashed passwords, and the profile fields of each, from create_user keys.
+        """
+        users = []
+        passwords = []
+        profiles_data = []
+        for user_data in users_data:
+            extra_fields = dict(user_data)
+            username = extra_fields.pop('username', None)
+            if not username:
+                raise ValueError('The given username must be set')
+            email = self.normalize_email(extra_fields.pop('email', None))
+            password = extra_fields.pop('password', None)
+            profiles_data.append({
+                'first_name': extra_fields.pop('first_name', None),
+                'last_name': extra_fields.pop('last_name', None),
+                'birthdate': extra_fields.pop('birthdate', None),
+            })
+            extra_fields.setdefault('is_staff', False)
+            extra_fields.setdefault('is_superuser', False)
+            users.append(self.model(username=self.model.normalize_username(username), email=email, **extra_fields))
+            passwords.append(password)
+        for user, encoded in zip(users, make_passwords(passwords)):
+            user.password = encoded
+        return users, profiles_data
+
+    def friend_ids(self, pks):
+        """
+        {user pk: sorted friend pks} for many users with a single query over the friends through table.
+        friends is symmetrical, so every friendship is stored in both directions.
+        """
+        friend_ids = {pk: [] for pk in pks}
+        rows = MyUser.friends.through.objects.filter(from_myuser_id__in=friend_ids).order_by(
+            'from_myuser_id', 'to_myuser_id',
+        ).values_list('from_myuser_id', 'to_myuser_id')
+        for pk, friend_id in rows:
+            friend_ids[pk].append(friend_id)
+        return friend_ids
+
+    async def afriend_ids(self, pks):
+        friend_ids = {pk: [] for pk in pks}
+        rows = MyUser.friends.through.objects.filter(from_myuser_id__in=friend_ids).order_by(
+            'from_myuser_id', 'to_myuser_id',
+        ).values_list('from_myuser_id', 'to_myuser_id')
+        async for pk, friend_id in rows:
+            friend_ids[pk].append(friend_id)
+        return friend_ids
+
+    def friends_of_friends(self, pk):
+        """
+        Users reachable in two hops who are not friends yet, annotated with their number of mutual friends.
+        """
+        friends = MyUser.friends.through.objects.filter(from_myuser_id=pk).values('to_myuser_id')
+        return self.filter(friends__in=friends).exclude(pk=pk).exclude(pk__in=friends).annotate(
+            mutual_friends=Count('friends'),
+        )
+
+    def mutual_friends(self, pk, other_pk):
+        friends = MyUser.friends.through.objects.filter(from_myuser_id=pk).values('to_myuser_id')
+        other_friends = MyUser.friends.through.objects.filter(from_myuser_id=other_pk).values('to_myuser_id')
+        return self.filter(pk__in=friends).filter(pk__in=other_friends)
+
     def get_or_create_user(self, username='test', password='test', **extra_fields):
-        try:
-            return MyUser.objects.get(username=username)
-        except MyUser.DoesNotExist:
-            return MyUser.objects.create_user(username=username, password=password, **extra_fields)
+        return self.get_or_create_users([{'username': username, 'password': password, **extra_fields}])[0]
+
+    def get_or_create_users(self, users_data, batch_size=None):
+        """
+        The users with the given usernames, in order (items take the same keys as create_user).
+        existing users cost a single query. missing ones are created with their profiles in one transaction,
+        through INSERT .. ON CONFLICT DO NOTHING: when a concurrent request creates the same username first,
+        its row is read back instead of raising IntegrityError. users are returned with my_profile loaded.
+        """
+        if batch_size is None:
+            batch_size = getattr(settings, 'USER_BULK_CREATE_BATCH_SIZE', 1000)
+        users_data = {self.model.normalize_username(user_data.get('username')): user_data for user_data in users_data}
+        usernames = list(users_data)
+        found = self.select_related('my_profile').in_bulk(usernames, field_name='username')
+        missing = [username for username in usernames if username not in found]
+        if missing:
+            users, profiles_data = self.build_users(users_data[username] for username in missing)
+            with transaction.atomic(using=self.db):
+                # inserting first takes the write lock before anything is read
+                self.bulk_create(users, batch_size=batch_size, ignore_conflicts=True)
+                stored = self.filter(username__in=missing).select_related('my_profile').in_bulk(field_name='username')
+                # rows committed by someone else come with their profile, rows without one are ours
+                profiles = [
+                    MyProfile(my_user=stored[user.username], **profile_data)
+                    for user, profile_data in zip(users, profiles_data)
+                    if not hasattr(stored[user.username], 'my_profile')
+                ]
+                MyProfile.objects.using(self.db).bulk_create(profiles, batch_size=batch_size)
+            for profile in profiles:
+                profile.my_user.my_profile = profile
+            found.update(stored)
+        return [found[username] for username in usernames]
 
 
 class MyUser(AbstractUser):
@@ -34,7 +166,17 @@ class MyUser(AbstractUser):
 
 class MyImage(models.Model):
     my_profile = models.ForeignKey('MyProfile', on_delete=models.CASCADE, related_name='my_images')
+    # no width_field / height_field: ImageField would read them from the file on every load (post_init)
+    # of a row without dimensions. they are stored once, when a new file is saved
     image = models.ImageField()
+    width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            # a new upload, still in memory / a temporary file. not an image: (None, None)
+            self.width, self.height = self.image.width, self.image.height
+        super().save(*args, **kwargs)
 
 
 class MyProfile(models.Model):
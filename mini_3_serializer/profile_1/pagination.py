@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a unique column (id, or username through ?ordering=).
+    every page is `WHERE id > <position> ORDER BY id LIMIT n`, so deep pages cost the same as the first one.
+    the cursor is opaque (base64) and supports both next and previous links.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
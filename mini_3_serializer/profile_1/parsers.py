@@ -0,0 +1,49 @@
+import datetime
+import struct
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from profile_1.renderers import EPOCH_DATE, MSGPACK_DATE_EXT_TYPE, FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser on orjson when it is installed (UTF-8 bodies), the stdlib JSONParser otherwise.
+    orjson always rejects NaN and infinities, like STRICT_JSON.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def msgpack_ext_hook(code, data):
+    if code == MSGPACK_DATE_EXT_TYPE and len(data) == 4:
+        return EPOCH_DATE + datetime.timedelta(days=struct.unpack('>i', data)[0])
+    return msgpack.ExtType(code, data)
+
+
+class MessagePackParser(BaseParser):
+    """
+    MessagePack request bodies, needs msgpack. timestamps become aware (UTC) datetimes and
+    MSGPACK_DATE_EXT_TYPE extensions dates, which DRF's date and datetime fields accept as they are.
+    """
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if msgpack is None:
+            raise ParseError('MessagePack is not supported (msgpack is not installed).')
+        try:
+            return msgpack.unpackb(stream.read(), ext_hook=msgpack_ext_hook, timestamp=3)
+        except (ValueError, OverflowError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
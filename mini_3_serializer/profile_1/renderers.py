@@ -0,0 +1,76 @@
+import datetime
+import struct
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# MessagePack extension type of dates: int32 big endian, days since 1970-01-01 (like Arrow's date32)
+MSGPACK_DATE_EXT_TYPE = 1
+EPOCH_DATE = datetime.date(1970, 1, 1)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson when it is installed, with the same output for the compact, unicode
+    configuration (the DRF defaults): dates and datetimes are ISO 8601, ReturnDict / ReturnList and
+    other dict, list and str subclasses (Hyperlink, ErrorDetail) are encoded natively, anything else
+    goes through DRF's JSONEncoder.default. indented output, ascii-only / non-compact settings and
+    values orjson rejects (e.g. integers over 64 bits) are rendered by JSONRenderer.
+    unlike STRICT_JSON, orjson renders NaN and infinities as null instead of failing.
+    """
+    if orjson is not None:
+        orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+        default = staticmethod(encoders.JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.orjson_options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # like JSONRenderer, escape U+2028 / U+2029 so the output is also valid javascript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for service-to-service calls, needs msgpack (pip install msgpack).
+    views hand the serializers context['native_dates'] for renderers with native_dates = True, so dates
+    and datetimes arrive here as python objects: aware datetimes are packed as the standard timestamp
+    extension (-1), dates as extension MSGPACK_DATE_EXT_TYPE. anything else msgpack can not pack
+    goes through DRF's JSONEncoder.default.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    native_dates = True
+    encoder_default = staticmethod(encoders.JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer needs msgpack (pip install msgpack).')
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.default, datetime=True, use_bin_type=True)
+
+    def default(self, obj):
+        if isinstance(obj, datetime.date) and not isinstance(obj, datetime.datetime):
+            return msgpack.ExtType(MSGPACK_DATE_EXT_TYPE, struct.pack('>i', (obj - EPOCH_DATE).days))
+        return self.encoder_default(obj)
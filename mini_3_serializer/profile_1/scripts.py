@@ -1,3 +1,4 @@
+from profile_1.logs import flush_spans
 from profile_1.models import MyUser
 from profile_1.serializers import UserSerializer, UserHyperLinkSerializer
 
@@ -160,6 +161,7 @@ def run(func):
         print('result:', result)
     except Exception as err:
         print('errors:', err)
+    flush_spans()
 
 
 run(serializing)
@@ -1,11 +1,520 @@
+import copy
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core import validators as django_validators
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.urls import NoReverseMatch, get_script_prefix, get_urlconf, reverse
 from rest_framework import serializers
-from rest_framework.fields import empty
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.fields import SkipField, empty
+from rest_framework.settings import api_settings
+from rest_framework.utils import html
+from rest_framework.validators import ProhibitSurrogateCharactersValidator, UniqueValidator
 
+from profile_1.caching import invalidate_representations
+from profile_1.compiled import compiled_to_representation, get_model_field
+from profile_1.fieldsets import field_selection_key
+from profile_1.hashers import make_passwords
 from profile_1.logs import start_end_log, message_log, level_log
 from profile_1.models import MyUser, MyProfile, MyImage
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+def get_eager_loading_paths(fields, prefix=''):
+    """
+    select_related / prefetch_related paths needed to render the given serializer fields
+    without a query per instance. anything below a to-many relation has to be prefetched.
+    """
+    select_related = []
+    prefetch_related = []
+    for field in fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        path = prefix + field.source.replace('.', '__')
+        if isinstance(field, serializers.ListSerializer):
+            child_select, child_prefetch = get_eager_loading_paths(field.child.fields, f'{path}__')
+            prefetch_related += [path] + child_select + child_prefetch
+        elif isinstance(field, serializers.BaseSerializer):
+            child_select, child_prefetch = get_eager_loading_paths(field.fields, f'{path}__')
+            select_related += [path] + child_select
+            prefetch_related += child_prefetch
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.append(path)
+    return select_related, prefetch_related
+
+
+def get_only_paths(serializer, prefix=''):
+    """
+    .only() paths of the model columns the serializer's readable fields render. None when a field needs
+    more than its own column (source '*', method fields, properties), then nothing can be deferred.
+    to-many and batch-loaded fields only need the pk, which is always loaded.
+    """
+    model = serializer.Meta.model
+    paths = [prefix + model._meta.pk.name]
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.HyperlinkedIdentityField):
+            paths.append(prefix + (model._meta.pk.name if field.lookup_field == 'pk' else field.lookup_field))
+            continue
+        if hasattr(field, 'batch_load') or isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            continue
+        if field.source == '*':
+            return None
+        try:
+            get_model_field(model, field)
+        except ImproperlyConfigured:
+            return None
+        path = prefix + '__'.join(field.source_attrs)
+        if isinstance(field, serializers.BaseSerializer):
+            nested = get_only_paths(field, f'{path}__')
+            if nested is None:
+                return None
+            paths += nested
+        elif len(field.source_attrs) > 1:
+            # a column behind a relation that is not select_related
+            return None
+        else:
+            paths.append(path)
+    return paths
+
+
+class EagerLoadingMixin:
+    """
+    Lets a model serializer prepare querysets for itself.
+    paths come from the nested serializers plus optional Meta.select_related / Meta.prefetch_related,
+    and are computed once per serializer class and field selection (see SparseFieldsMixin).
+    with a field selection, only the selected relations are joined and only their columns are loaded.
+    """
+
+    @classmethod
+    def get_loading_paths(cls, fields=None):
+        if '_eager_loading' not in cls.__dict__:
+            cls._eager_loading = {}
+        key = field_selection_key(fields)
+        if key not in cls._eager_loading:
+            serializer = cls(context={'fields': fields})
+            select_related, prefetch_related = get_eager_loading_paths(serializer.fields)
+            select_related += getattr(cls.Meta, 'select_related', [])
+            prefetch_related += getattr(cls.Meta, 'prefetch_related', [])
+            # extra Meta.select_related paths may need columns no field renders
+            only = None if fields is None or hasattr(cls.Meta, 'select_related') else get_only_paths(serializer)
+            cls._eager_loading[key] = (select_related, prefetch_related, only)
+        return cls._eager_loading[key]
+
+    @classmethod
+    def get_eager_loading(cls, fields=None):
+        select_related, prefetch_related, _ = cls.get_loading_paths(fields)
+        return select_related, prefetch_related
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        select_related, prefetch_related, only = cls.get_loading_paths(fields)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if only is not None:
+            queryset = queryset.only(*only, *get_ordering_paths(queryset))
+        return queryset
+
+
+def get_ordering_paths(queryset):
+    return [field.lstrip('-') for field in queryset.query.order_by if isinstance(field, str)]
+
+
+def clone_field(field):
+    """
+    Copy of an unbound template field. plain fields are copied attribute by attribute instead of
+    being re-instantiated from their arguments, fields holding other fields (nested serializers,
+    many related fields, list / dict children) are deep copied so nothing bound is shared.
+    """
+    if isinstance(field, serializers.BaseSerializer) or hasattr(field, 'child') or hasattr(field, 'child_relation'):
+        return copy.deepcopy(field)
+    clone = copy.copy(field)
+    clone.validators = list(field.validators)
+    return clone
+
+
+class CachedFieldsMixin:
+    """
+    Builds the fields and validators of a serializer once per class and hands every instance clones
+    of them, instead of introspecting the model, Meta.extra_kwargs and unique constraints each time.
+    only for serializers whose fields do not depend on the instance, the data or the context.
+    set cache_fields = False on a class to build them per instance again.
+    """
+    cache_fields = True
+
+    def get_fields(self):
+        cls = type(self)
+        if not self.cache_fields:
+            return super().get_fields()
+        if '_fields_template' not in cls.__dict__:
+            cls._fields_template = super().get_fields()
+        return {field_name: clone_field(field) for field_name, field in cls._fields_template.items()}
+
+    def get_validators(self):
+        cls = type(self)
+        if not self.cache_fields:
+            return super().get_validators()
+        if '_validators_template' not in cls.__dict__:
+            cls._validators_template = super().get_validators()
+        return list(cls._validators_template)
+
+
+class SparseFieldsMixin:
+    """
+    Keeps only the fields of a field selection (see profile_1/fieldsets.py), dropped before they are bound.
+    the top level serializer reads it from context['fields'], nested serializers get their part from the parent.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.get_field_selection()
+        if selection is None:
+            return fields
+        fields = {field_name: field for field_name, field in fields.items() if field_name in selection}
+        for field_name, field in fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if selection[field_name] is not None and isinstance(field, serializers.BaseSerializer):
+                field.field_selection = selection[field_name]
+        return fields
+
+    def get_field_selection(self):
+        if hasattr(self, 'field_selection'):
+            return self.field_selection
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return self.context.get('fields') if parent is None else None
+
+
+def get_field_selection(serializer):
+    return serializer.get_field_selection() if hasattr(serializer, 'get_field_selection') else None
+
+
+class NativeDatesMixin:
+    """
+    With context['native_dates'] (set by views for binary renderers such as MessagePackRenderer), date,
+    datetime and time fields render python objects instead of ISO 8601 strings, so the renderer can encode them natively.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get('native_dates'):
+            for field in fields.values():
+                if isinstance(field, (serializers.DateField, serializers.DateTimeField, serializers.TimeField)):
+                    field.format = None
+        return fields
+
+
+# fields whose run_validation only depends on the input value and the field's own arguments
+MEMOIZED_FIELD_CLASSES = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.DateField,
+    serializers.DecimalField,
+    serializers.FloatField,
+    serializers.IntegerField,
+)
+# validators that do not query the database (unlike UniqueValidator and friends)
+MEMOIZED_VALIDATOR_CLASSES = (
+    django_validators.BaseValidator,
+    django_validators.DecimalValidator,
+    django_validators.EmailValidator,
+    django_validators.ProhibitNullCharactersValidator,
+    django_validators.RegexValidator,
+    ProhibitSurrogateCharactersValidator,
+)
+MEMOIZED_INPUT_TYPES = (str, int, float, bool)
+
+
+def is_memoizable(field):
+    return (
+        isinstance(field, MEMOIZED_FIELD_CLASSES)
+        # write only fields are secrets like passwords more often than not, keep them out of the cache
+        and not field.read_only and not field.write_only
+        and field.style.get('input_type') != 'password'
+        and all(isinstance(validator, MEMOIZED_VALIDATOR_CLASSES) for validator in field.validators)
+    )
+
+
+def memoize_run_validation(field, parse):
+    """
+    Replace the field's run_validation with a lookup in `parse`, the LRU cached run_validation of an equal field.
+    only plain JSON scalars go through the cache, and only while the field keeps its validators.
+    """
+    run_validation = field.run_validation
+    validators = field.validators
+
+    def memoized(data=empty):
+        if type(data) not in MEMOIZED_INPUT_TYPES or field.validators is not validators:
+            return run_validation(data)
+        valid, result = parse(data)
+        if not valid:
+            raise ValidationError(result)
+        return result
+
+    field.run_validation = memoized
+
+
+class MemoizedValidationMixin:
+    """
+    Memoizes the parsing and validation of the serializer's pure fields (dates, strings with max_length, ...)
+    per class and field name, in a bounded LRU of settings.VALIDATION_CACHE_SIZE entries per field,
+    so repeated values (bulk payloads, the same birthdate on many requests) are parsed once.
+    fields with database dependent validators (e.g. UniqueValidator) are never memoized.
+    set memoize_validation = False on a class to turn it off, validation_cache_info() has the hits and misses.
+    """
+    memoize_validation = True
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.memoize_validation:
+            return fields
+        caches = self.get_validation_caches()
+        for field_name, field in fields.items():
+            if field_name not in caches:
+                caches[field_name] = self.build_validation_cache(field) if is_memoizable(field) else None
+            if caches[field_name] is not None:
+                memoize_run_validation(field, caches[field_name])
+        return fields
+
+    @classmethod
+    def get_validation_caches(cls):
+        if '_validation_caches' not in cls.__dict__:
+            cls._validation_caches = {}
+        return cls._validation_caches
+
+    @staticmethod
+    def build_validation_cache(field):
+        template = clone_field(field)
+
+        @lru_cache(maxsize=getattr(settings, 'VALIDATION_CACHE_SIZE', 1024), typed=True)
+        def parse(data):
+            try:
+                return True, template.run_validation(data)
+            except ValidationError as exc:
+                return False, exc.detail
+
+        return parse
+
+    @classmethod
+    def validation_cache_info(cls):
+        """
+        {field name: (hits, misses, maxsize, currsize)} of the memoized fields.
+        """
+        return {
+            field_name: parse.cache_info()
+            for field_name, parse in cls.get_validation_caches().items()
+            if parse is not None
+        }
+
+    @classmethod
+    def clear_validation_cache(cls):
+        for parse in cls.get_validation_caches().values():
+            if parse is not None:
+                parse.cache_clear()
+
+
+class EagerLoadingListSerializer(serializers.ListSerializer):
+    """
+    Applies the child's eager loading to querysets that have not been evaluated yet,
+    or renders them through the compiled fast path when the child sets Meta.compiled = True.
+    fields with a `batch_load(pks)` method get the pks of the whole list before the rows are rendered.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        if isinstance(data, models.QuerySet) and data._result_cache is None:
+            if getattr(self.child.Meta, 'compiled', False):
+                return compiled_to_representation(self.child, data)
+            if hasattr(self.child, 'setup_eager_loading'):
+                data = self.child.setup_eager_loading(data, get_field_selection(self.child))
+        batch_fields = [field for field in self.child._readable_fields if hasattr(field, 'batch_load')]
+        if batch_fields:
+            data = list(data)
+            pks = [instance.pk for instance in data]
+            for field in batch_fields:
+                field.batch_load(pks)
+        return super().to_representation(data)
+
+    async def adata(self):
+        """
+        Async counterpart of .data: an unevaluated queryset is fetched with async iteration
+        and batch-loaded fields through abatch_load, so rendering the rows runs no query.
+        compiled lists are rendered in a single worker thread call.
+        """
+        if not hasattr(self, '_data'):
+            data = self.instance
+            if isinstance(data, models.Manager):
+                data = data.all()
+            if isinstance(data, models.QuerySet) and data._result_cache is None:
+                if getattr(self.child.Meta, 'compiled', False):
+                    self._data = await sync_to_async(compiled_to_representation)(self.child, data)
+                    return self.data
+                if hasattr(self.child, 'setup_eager_loading'):
+                    data = self.child.setup_eager_loading(data, get_field_selection(self.child))
+                data = [instance async for instance in data]
+            data = list(data)
+            await abatch_load_fields(self.child, [instance.pk for instance in data])
+            self._data = serializers.ListSerializer.to_representation(self, data)
+        return self.data
+
+
+async def abatch_load_fields(serializer, pks):
+    for field in serializer._readable_fields:
+        if hasattr(field, 'abatch_load'):
+            await field.abatch_load(pks)
+
+
+class BatchLoadedField(serializers.Field):
+    """
+    Read-only field whose values are loaded for a whole list at once: list serializers call
+    batch_load(pks) before rendering the rows, a single instance falls back to load([pk]).
+    subclasses implement load(pks) -> {pk: value}.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.loaded = {}
+
+    def load(self, pks):
+        raise NotImplementedError('`load()` must be implemented.')
+
+    def batch_load(self, pks):
+        self.loaded = self.load(pks)
+        return self.loaded
+
+    async def aload(self, pks):
+        return await sync_to_async(self.load)(pks)
+
+    async def abatch_load(self, pks):
+        self.loaded = await self.aload(pks)
+        return self.loaded
+
+    def to_representation(self, instance):
+        value = self.loaded.get(instance.pk)
+        if value is None:
+            value = self.load([instance.pk])[instance.pk]
+        return value
+
+
+class FriendsField(BatchLoadedField):
+    """
+    Friend ids, one query over the friends through table per list.
+    """
+
+    def load(self, pks):
+        return MyUser.objects.friend_ids(pks)
+
+    async def aload(self, pks):
+        return await MyUser.objects.afriend_ids(pks)
+
+
+class ImagesField(BatchLoadedField):
+    """
+    Images of the user's profile rendered with ImageSerializer, one query per list.
+    urls come from the storage and dimensions from the database, image files are never opened.
+    """
+
+    def load(self, pks):
+        images = {pk: [] for pk in pks}
+        serializer = ImageSerializer(context=self.context)
+        for image in self.get_queryset(pks):
+            images[image.my_user_id].append(serializer.to_representation(image))
+        return images
+
+    async def aload(self, pks):
+        images = {pk: [] for pk in pks}
+        serializer = ImageSerializer(context=self.context)
+        async for image in self.get_queryset(pks):
+            images[image.my_user_id].append(serializer.to_representation(image))
+        return images
+
+    def get_queryset(self, pks):
+        return MyImage.objects.filter(my_profile__my_user_id__in=pks).annotate(
+            my_user_id=models.F('my_profile__my_user_id'),
+        ).order_by('pk')
+
+
+class AsyncSerializerMixin:
+    """
+    Coroutine counterparts of is_valid(), save() and data, for model serializers served under ASGI.
+    field validation and rendering stay plain python, the queries (unique validators, writes,
+    batch-loaded fields) go through the async ORM. instances are expected with their
+    select_related paths loaded (see setup_eager_loading), lazy relations would query synchronously.
+    in Django 4.2 the async ORM itself still runs each query in a worker thread.
+    """
+
+    async def ais_valid(self, *, raise_exception=False):
+        assert hasattr(self, 'initial_data'), (
+            'Cannot call `.ais_valid()` as no `data=` keyword argument was '
+            'passed when instantiating the serializer instance.'
+        )
+        if not hasattr(self, '_validated_data'):
+            unique_fields = get_unique_validators(self)
+            with deferred_validators(unique_fields):
+                try:
+                    self._validated_data = self.run_validation(self.initial_data)
+                except ValidationError as exc:
+                    self._validated_data = {}
+                    self._errors = exc.detail
+                else:
+                    self._errors = {}
+            for field, validator in unique_fields:
+                if await self.ahas_unique_conflict(field, validator):
+                    self._validated_data = {}
+                    self._errors = add_field_error(self, self._errors, field.field_name, unique_error(validator))
+        if self._errors and raise_exception:
+            raise ValidationError(self.errors)
+        return not bool(self._errors)
+
+    async def ahas_unique_conflict(self, field, validator):
+        value = get_field_value(field, self.initial_data)
+        if value is None:
+            return False
+        queryset = validator.queryset.filter(**{field.source_attrs[-1]: value})
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        return await queryset.aexists()
+
+    async def asave(self, **kwargs):
+        assert hasattr(self, '_errors'), 'You must call `.ais_valid()` before calling `.asave()`.'
+        assert not self.errors, 'You cannot call `.asave()` on a serializer with invalid data.'
+        validated_data = {**self.validated_data, **kwargs}
+        if self.instance is not None:
+            self.instance = await self.aupdate(self.instance, validated_data)
+        else:
+            self.instance = await self.acreate(validated_data)
+        return self.instance
+
+    async def acreate(self, validated_data):
+        serializers.raise_errors_on_nested_writes('acreate', self, validated_data)
+        return await self.Meta.model._default_manager.acreate(**validated_data)
+
+    async def aupdate(self, instance, validated_data):
+        serializers.raise_errors_on_nested_writes('aupdate', self, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        await instance.asave()
+        return instance
+
+    async def adata(self):
+        if not hasattr(self, '_data') and self.instance is not None and not getattr(self, '_errors', None):
+            await abatch_load_fields(self, [self.instance.pk])
+        return self.data
+
+
+class ProfileSerializer(MemoizedValidationMixin, SparseFieldsMixin, NativeDatesMixin, CachedFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     @start_end_log
     @message_log('PS')
     @level_log(1)
@@ -50,6 +559,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = MyProfile
+        list_serializer_class = EagerLoadingListSerializer
         fields = [
             'first_name',
             'last_name',
@@ -57,29 +567,250 @@ class ProfileSerializer(serializers.ModelSerializer):
         ]
 
 
-class ImageSerializer(serializers.ModelSerializer):
+class ImageSerializer(CachedFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = MyImage
         fields = [
             'image',
+            'width',
+            'height',
         ]
 
 
-class UserSerializer(serializers.ModelSerializer):
-    # images = ImageSerializer(required=False, many=True)
+def set_changed_values(instance, data):
+    """
+    Set the values of `data` that differ from the instance, return the names of the changed fields.
+    """
+    changed = []
+    for attr, value in data.items():
+        if getattr(instance, attr) != value:
+            setattr(instance, attr, value)
+            changed.append(attr)
+    return changed
+
+
+def get_unique_validators(serializer):
+    """
+    (field, validator) pairs of the serializer's writable fields with an exact UniqueValidator.
+    """
+    return [
+        (field, validator)
+        for field in serializer._writable_fields
+        for validator in field.validators
+        if isinstance(validator, UniqueValidator) and validator.lookup == 'exact'
+    ]
+
+
+@contextmanager
+def deferred_validators(pairs):
+    """
+    Take the validators of (field, validator) pairs off their fields, so the caller can run them another way.
+    """
+    validators = {field: field.validators for field, _ in pairs}
+    for field, validator in pairs:
+        field.validators = [other for other in field.validators if other is not validator]
+    try:
+        yield
+    finally:
+        for field, field_validators in validators.items():
+            field.validators = field_validators
+
+
+def get_field_value(field, data):
+    """
+    The value the field's validators would see for this input, None when they would not run.
+    """
+    if not isinstance(data, Mapping):
+        return None
+    try:
+        is_empty, value = field.validate_empty_values(field.get_value(data))
+        if is_empty:
+            return None
+        return field.to_internal_value(value)
+    except (ValidationError, SkipField):
+        return None
+
+
+def unique_error(validator):
+    return ErrorDetail(str(validator.message), code='unique')
+
+
+def add_field_error(serializer, errors, field_name, error):
+    """
+    Add a field error to a serializer's errors, in field order.
+    """
+    if not any(key != api_settings.NON_FIELD_ERRORS_KEY for key in errors):
+        # object level validation does not run after a field error
+        errors = {}
+    errors = {**errors, field_name: [*errors.get(field_name, []), error]}
+    order = [*serializer.fields, api_settings.NON_FIELD_ERRORS_KEY]
+    return {key: errors[key] for key in order if key in errors}
+
+
+class UserListSerializer(EagerLoadingListSerializer):
+    """
+    many=True create and update paths: rows are still validated one by one by UserSerializer,
+    except for unique fields, which are checked for the whole list in a few queries.
+    users and profiles are written with bulk_create / bulk_update in one transaction.
+    updates pair the n-th item of the data with the n-th instance.
+    """
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'USER_BULK_CREATE_BATCH_SIZE', 1000)
+
+    @property
+    def unique_check_chunk_size(self):
+        return getattr(settings, 'USER_UNIQUE_CHECK_CHUNK_SIZE', 500)
+
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = html.parse_html_list(data, default=[])
+        if not isinstance(data, list) or not data or not self.has_valid_length(data):
+            # let ListSerializer raise its list level errors
+            return super().to_internal_value(data)
+
+        instances = [None] * len(data)
+        if self.instance is not None:
+            instances = self.instance
+            if isinstance(instances, models.QuerySet) and instances._result_cache is None:
+                instances = self.child.setup_eager_loading(instances)
+            self.instance = instances = list(instances)
+            if len(instances) != len(data):
+                message = f'Expected {len(instances)} items, one per instance to update, but got {len(data)}.'
+                raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='invalid')
+
+        results, errors = self.validate_items(data, instances)
+        if any(errors):
+            raise ValidationError(errors)
+        return results
+
+    def validate_items(self, data, instances=None):
+        """
+        Validate every item with the child, without raising: returns (validated data or None, errors) per item.
+        """
+        if instances is None:
+            instances = [None] * len(data)
+        unique_fields = get_unique_validators(self.child)
+        results = []
+        errors = []
+        # the unique validators would query once per item, check_unique queries once per chunk instead
+        with deferred_validators(unique_fields):
+            for instance, item in zip(instances, data):
+                # validate against the instance being updated, e.g. so the unique username check excludes it
+                self.child.instance = instance
+                try:
+                    results.append(self.child.run_validation(item))
+                    errors.append({})
+                except ValidationError as exc:
+                    results.append(None)
+                    errors.append(exc.detail)
+                finally:
+                    self.child.instance = None
+        for field, validator in unique_fields:
+            self.check_unique(field, validator, data, instances, results, errors)
+        return results, errors
+
+    def has_valid_length(self, data):
+        return (
+            (self.max_length is None or len(data) <= self.max_length)
+            and (self.min_length is None or len(data) >= self.min_length)
+        )
+
+    def check_unique(self, field, validator, data, instances, results, errors):
+        """
+        Run `validator` for every item at once: chunked IN queries for the values already stored,
+        plus a check for values repeated in the payload (every occurrence after the first conflicts).
+        conflicting items get the validator's error at their index, like the per item validator would report.
+        """
+        values = {}
+        for index, item in enumerate(data):
+            value = get_field_value(field, item)
+            if value is not None:
+                values[index] = value
+
+        model_field_name = field.source_attrs[-1]
+        distinct = list(dict.fromkeys(values.values()))
+        stored = {}
+        for start in range(0, len(distinct), self.unique_check_chunk_size):
+            chunk = distinct[start:start + self.unique_check_chunk_size]
+            lookup = {f'{model_field_name}__in': chunk}
+            for value, pk in validator.queryset.filter(**lookup).values_list(model_field_name, 'pk'):
+                stored.setdefault(value, set()).add(pk)
+
+        seen = set()
+        for index, value in values.items():
+            instance = instances[index]
+            conflicts = stored.get(value, set()) - {instance.pk if instance is not None else None}
+            if conflicts or value in seen:
+                results[index] = None
+                errors[index] = add_field_error(self.child, errors[index], field.field_name, unique_error(validator))
+            seen.add(value)
+
+    def create(self, validated_data):
+        return MyUser.objects.bulk_create_users(
+            [self.child.get_create_kwargs(attrs) for attrs in validated_data],
+            batch_size=self.batch_size,
+        )
+
+    def update(self, instances, validated_data):
+        user_fields = set()
+        users = []
+        profile_fields = set()
+        profiles = []
+        new_profiles = []
+        passwords = []
+        for instance, attrs in zip(instances, validated_data):
+            changed_user_fields, profile, changed_profile_fields = self.child.apply_update(instance, attrs)
+            if attrs.get('password'):
+                passwords.append((instance, attrs['password']))
+                changed_user_fields.append('password')
+            if changed_user_fields:
+                user_fields.update(changed_user_fields)
+                users.append(instance)
+            if profile._state.adding:
+                if changed_profile_fields:
+                    new_profiles.append(profile)
+            elif changed_profile_fields:
+                profile_fields.update(changed_profile_fields)
+                profiles.append(profile)
+        for (instance, _), encoded in zip(passwords, make_passwords(raw for _, raw in passwords)):
+            instance.password = encoded
+
+        if not (users or profiles or new_profiles):
+            return instances
+        with transaction.atomic():
+            if users:
+                MyUser.objects.bulk_update(users, sorted(user_fields), batch_size=self.batch_size)
+            if profiles:
+                MyProfile.objects.bulk_update(profiles, sorted(profile_fields), batch_size=self.batch_size)
+            if new_profiles:
+                MyProfile.objects.bulk_create(new_profiles, batch_size=self.batch_size)
+        # bulk writes send no post_save signals
+        pks = {instance.pk for instance in users} | {profile.my_user_id for profile in profiles + new_profiles}
+        invalidate_representations(pks)
+        return instances
+
+
+class UserSerializer(AsyncSerializerMixin, SparseFieldsMixin, NativeDatesMixin, CachedFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    images = ImagesField()
     my_profile = ProfileSerializer(required=False)
+    friends = FriendsField()
     # custom_field = CustomField()
 
     class Meta:
         model = MyUser
+        list_serializer_class = UserListSerializer
         fields = [
             'username',
             'password',
-            # 'images',
+            'images',
             'my_profile',
+            'friends',
             # 'custom_field',
         ]
+        # compiled = True  # read-only lists from .values_list() rows, see profile_1/compiled.py
         extra_kwargs = {
             'password': {'write_only': True, 'required': False}
         }
@@ -135,10 +866,13 @@ class UserSerializer(serializers.ModelSerializer):
     @message_log('US')
     def to_representation(self, instance):
         super_data = super().to_representation(instance)
-        super_data['new_field'] = 'new_field_value'
-        result = super_data
+        result = self.finalize_representation(super_data)
         return result
 
+    def finalize_representation(self, data):
+        data['new_field'] = 'new_field_value'
+        return data
+
     @start_end_log
     @message_log('US')
     def get_custom_char_field(self):
@@ -153,35 +887,134 @@ class UserSerializer(serializers.ModelSerializer):
     @start_end_log
     @message_log('US')
     def create(self, validated_data):
-        instance = MyUser.objects.create_user(
-            username=validated_data.get('username'),
-            password=validated_data.get('password'),
-            first_name=validated_data.get('my_profile').get('first_name'),
-            last_name=validated_data.get('my_profile').get('last_name'),
-            birthdate=validated_data.get('my_profile').get('birthdate'),
-        )
+        instance = MyUser.objects.create_user(**self.get_create_kwargs(validated_data))
         result = instance
         return result
 
+    async def acreate(self, validated_data):
+        return await MyUser.objects.acreate_user(**self.get_create_kwargs(validated_data))
+
+    def get_create_kwargs(self, validated_data):
+        profile_data = validated_data.get('my_profile') or {}
+        return {
+            'username': validated_data.get('username'),
+            'password': validated_data.get('password'),
+            'first_name': profile_data.get('first_name'),
+            'last_name': profile_data.get('last_name'),
+            'birthdate': profile_data.get('birthdate'),
+        }
+
     @start_end_log
     @message_log('US')
     def update(self, instance, validated_data):
-        instance.username = validated_data.get('username', instance.username)
+        user_fields, profile, profile_fields = self.apply_update(instance, validated_data)
         new_password = validated_data.get('password', None)
         if new_password:
             instance.set_password(new_password)
+            user_fields.append('password')
 
-        profile_data = validated_data.pop('my_profile', None)
-        if profile_data:
-            instance.my_profile.first_name = profile_data.get('first_name', instance.my_profile.first_name)
-            instance.my_profile.last_name = profile_data.get('last_name', instance.my_profile.last_name)
-            instance.my_profile.birthdate = profile_data.get('birthdate', instance.my_profile.birthdate)
-        instance.save()
+        self.save_changes(instance, user_fields, profile, profile_fields)
         result = instance
         return result
 
+    async def aupdate(self, instance, validated_data):
+        if not MyUser.my_profile.is_cached(instance):
+            profile = await MyProfile.objects.filter(my_user=instance).afirst()
+            MyUser.my_profile.related.set_cached_value(instance, profile)
+        user_fields, profile, profile_fields = self.apply_update(instance, validated_data)
+        new_password = validated_data.get('password', None)
+        if new_password:
+            instance.password = await sync_to_async(make_password, thread_sensitive=False)(new_password)
+            instance._password = new_password
+            user_fields.append('password')
+        # there are no async transactions, the transaction runs in one worker thread call
+        await sync_to_async(self.save_changes)(instance, user_fields, profile, profile_fields)
+        return instance
+
+    def save_changes(self, instance, user_fields, profile, profile_fields):
+        if user_fields or profile_fields:
+            with transaction.atomic():
+                if user_fields:
+                    instance.save(update_fields=user_fields)
+                if profile_fields:
+                    profile.save(update_fields=None if profile._state.adding else profile_fields)
+
+    def apply_update(self, instance, validated_data):
+        """
+        Copy the validated values that differ from the current ones onto the user and its profile
+        (a new unsaved profile when the user has none). the password is left to the caller.
+        returns (changed user fields, profile, changed profile fields).
+        """
+        user_data = {attr: validated_data[attr] for attr in ['username'] if attr in validated_data}
+        user_fields = set_changed_values(instance, user_data)
+        profile_data = validated_data.get('my_profile') or {}
+        try:
+            profile = instance.my_profile
+        except MyProfile.DoesNotExist:
+            profile = MyProfile(my_user=instance)
+        profile_fields = set_changed_values(profile, profile_data)
+        return user_fields, profile, profile_fields
+
+
+# lookup value reversed into url templates, digits so it also matches <int:pk> routes
+URL_TEMPLATE_PLACEHOLDER = '918273645546372819'
+
+
+@lru_cache(maxsize=128)
+def get_url_template(view_name, lookup_url_kwarg, urlconf, script_prefix):
+    """
+    (prefix, suffix) of the view's url around its lookup value, None when the view can not be reversed
+    with the placeholder. urlconf and script_prefix are only part of the cache key.
+    """
+    try:
+        url = reverse(view_name, kwargs={lookup_url_kwarg: URL_TEMPLATE_PLACEHOLDER})
+    except NoReverseMatch:
+        return None
+    if url.count(URL_TEMPLATE_PLACEHOLDER) != 1:
+        return None
+    prefix, suffix = url.split(URL_TEMPLATE_PLACEHOLDER)
+    return prefix, suffix
+
+
+class TemplatedHyperlinkedIdentityField(serializers.HyperlinkedIdentityField):
+    """
+    HyperlinkedIdentityField that reverses its view once per process into a url template and builds
+    each row's url by inserting the pk, with the request's scheme and host looked up once per field.
+    versioned requests, format suffixes, ?format= (DRF's reverse() keeps it on the url)
+    and non integer lookups still go through reverse().
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        lookup_value = getattr(obj, self.lookup_field)
+        if (
+            format or type(lookup_value) is not int or getattr(request, 'versioning_scheme', None) is not None
+            or (request is not None and api_settings.URL_FORMAT_OVERRIDE in request.GET)
+        ):
+            return super().get_url(obj, view_name, request, format)
+        template = get_url_template(
+            view_name, self.lookup_url_kwarg, get_urlconf(settings.ROOT_URLCONF), get_script_prefix(),
+        )
+        if template is None:
+            return super().get_url(obj, view_name, request, format)
+        prefix, suffix = template
+        return f'{self.get_url_base(request)}{prefix}{lookup_value}{suffix}'
+
+    def get_url_base(self, request):
+        """
+        'scheme://host' of the request, '' without one (relative urls).
+        """
+        if request is None:
+            return ''
+        cached = getattr(self, '_url_base', None)
+        if cached is None or cached[0] is not request:
+            cached = self._url_base = (request, request.build_absolute_uri('/')[:-1])
+        return cached[1]
+
+
+class UserHyperLinkSerializer(AsyncSerializerMixin, SparseFieldsMixin, NativeDatesMixin, CachedFieldsMixin, EagerLoadingMixin, serializers.HyperlinkedModelSerializer):
+    serializer_url_field = TemplatedHyperlinkedIdentityField
 
-class UserHyperLinkSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = MyUser
+        list_serializer_class = EagerLoadingListSerializer
         fields = ['id', 'username', 'url', ]
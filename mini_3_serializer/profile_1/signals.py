@@ -0,0 +1,34 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from profile_1.caching import invalidate_representations
+from profile_1.models import MyUser, MyProfile, MyImage
+
+
+@receiver(post_save, sender=MyUser)
+@receiver(post_delete, sender=MyUser)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_representations([instance.pk])
+
+
+@receiver(post_save, sender=MyProfile)
+@receiver(post_delete, sender=MyProfile)
+def invalidate_profile(sender, instance, **kwargs):
+    invalidate_representations([instance.my_user_id])
+
+
+@receiver(post_save, sender=MyImage)
+@receiver(post_delete, sender=MyImage)
+def invalidate_image(sender, instance, **kwargs):
+    my_user_ids = MyProfile.objects.filter(pk=instance.my_profile_id).values_list('my_user_id', flat=True)
+    invalidate_representations(list(my_user_ids))
+
+
+@receiver(m2m_changed, sender=MyUser.friends.through)
+def invalidate_friends(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # friends is symmetrical, both sides of every removed friendship change
+        invalidate_representations([instance.pk, *instance.friends.values_list('pk', flat=True)])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_representations([instance.pk, *pk_set])
+
@@ -0,0 +1,62 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def get_json_encoder():
+    # same output as rest_framework.renderers.JSONRenderer
+    return JSONEncoder(
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+    )
+
+
+def iter_json_list(serializer_class, queryset, context, chunk_size):
+    """
+    Serialize the queryset `chunk_size` rows at a time and yield the JSON array piece by piece,
+    so only one chunk of instances and representations is alive at once.
+    """
+    encoder = get_json_encoder()
+    separator = ''
+    chunk = []
+
+    def encode_chunk():
+        # '[{...},{...}]' -> '{...},{...}'
+        return separator + encoder.encode(serializer_class(chunk, many=True, context=context).data)[1:-1]
+
+    yield '['
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            yield encode_chunk()
+            separator = ','
+            chunk = []
+    if chunk:
+        yield encode_chunk()
+    yield ']'
+
+
+async def aiter_sync(iterator):
+    """
+    Drive a sync (ORM) iterator from the event loop, one thread hop per chunk.
+    Django would otherwise consume a sync streaming iterator into a list before sending it under ASGI.
+    """
+    next_part = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            part = await next_part(iterator, None)
+            if part is None:
+                break
+            yield part
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def streaming_json_response(request, serializer_class, queryset, context, chunk_size):
+    content = iter_json_list(serializer_class, queryset, context, chunk_size)
+    if isinstance(request, ASGIRequest):
+        content = aiter_sync(content)
+    return StreamingHttpResponse(content, content_type='application/json')
@@ -1,3 +1,1135 @@
-from django.test import TestCase
+import json
+import pickle
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import tempfile
+import threading
+from collections import deque
+from io import BytesIO, StringIO
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.relations import Hyperlink
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework.request import Request
+from rest_framework.test import force_authenticate
+from PIL import Image
+
+from profile_1.caching import cached_representations
+from profile_1.compiled import compile_serializer, compiled_to_representation
+from profile_1.fieldsets import parse_field_selection
+from profile_1 import hashers, logs, renderers
+from profile_1.models import MyUser, MyProfile, MyImage
+from profile_1.parsers import FastJSONParser, MessagePackParser
+from profile_1.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from profile_1.serializers import UserSerializer, UserListSerializer, ProfileSerializer, UserHyperLinkSerializer, is_memoizable
+from profile_1.views import UserImportView
+
+
+class UserListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users(
+            {'username': f'user{i}', 'first_name': f'first {i}', 'birthdate': '2023-09-16'} for i in range(1000)
+        )
+
+    def test_eager_loading_paths(self):
+        self.assertEqual(UserSerializer.get_eager_loading(), (['my_profile'], []))
+
+    def test_list_with_nested_profile_takes_constant_queries(self):
+        # users joined with their profiles, then one query each for all images and all friend ids
+        with self.assertNumQueries(3):
+            data = UserSerializer(MyUser.objects.order_by('id'), many=True).data
+        self.assertEqual(len(data), 1000)
+        self.assertEqual(data[999]['my_profile']['first_name'], 'first 999')
+
+    def test_user_without_profile(self):
+        MyUser.objects.create(username='no_profile')
+        with self.assertNumQueries(3):
+            data = UserSerializer(MyUser.objects.filter(username='no_profile'), many=True).data
+        self.assertIsNone(data[0]['my_profile'])
+
+
+class CompiledUserSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        compiled = True
+
+
+class CompiledRepresentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users([
+            {'username': 'full', 'first_name': 'first', 'last_name': 'last', 'birthdate': '2023-09-16'},
+            {'username': 'empty_names', 'first_name': '', 'last_name': ''},
+            {'username': 'nulls'},
+            {'username': 'unicode', 'first_name': 'نام', 'birthdate': '1999-01-31'},
+        ])
+        no_profile = MyUser.objects.create(username='no_profile')
+        no_profile.friends.add(*MyUser.objects.filter(username__in=['full', 'nulls']))
+        profile = MyProfile.objects.get(my_user__username='full')
+        MyImage.objects.bulk_create([
+            MyImage(my_profile=profile, image='a.png', width=10, height=20),
+            MyImage(my_profile=profile, image='b.png', width=30, height=40),
+        ])
+
+    def assertParity(self, serializer_class, queryset):
+        expected = serializer_class(queryset, many=True).data
+        compiled = compiled_to_representation(serializer_class(), queryset)
+        self.assertEqual(compiled, expected)
+        self.assertEqual([list(item) for item in compiled], [list(item) for item in expected])
+
+    def test_user_parity(self):
+        self.assertParity(UserSerializer, MyUser.objects.order_by('id'))
+
+    def test_profile_parity(self):
+        self.assertParity(ProfileSerializer, MyProfile.objects.order_by('id'))
+
+    def test_meta_compiled_list(self):
+        queryset = MyUser.objects.order_by('id')
+        with self.assertNumQueries(3):
+            data = CompiledUserSerializer(queryset, many=True).data
+        self.assertEqual(data, UserSerializer(queryset, many=True).data)
+
+    def test_native_dates(self):
+        queryset = MyUser.objects.order_by('id')
+        for native_dates in [True, False]:
+            context = {'native_dates': native_dates}
+            data = CompiledUserSerializer(queryset, many=True, context=context).data
+            self.assertEqual(data, UserSerializer(queryset, many=True, context=context).data)
+            self.assertEqual(data[0]['my_profile']['birthdate'], date(2023, 9, 16) if native_dates else '2023-09-16')
+
+    def test_evaluated_queryset_uses_regular_path(self):
+        queryset = MyUser.objects.select_related('my_profile').order_by('id')
+        list(queryset)
+        with self.assertNumQueries(2):
+            data = CompiledUserSerializer(queryset, many=True).data
+        self.assertEqual(len(data), 5)
+
+    def test_unsupported_field(self):
+        with self.assertRaises(ImproperlyConfigured):
+            compile_serializer(UserHyperLinkSerializer)
+
+
+class StreamingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users({'username': f'user{i}'} for i in range(1203))
+
+    def setUp(self):
+        caches['representations'].clear()
+
+    def test_streamed_list_matches_regular_list(self):
+        response = self.client.get('/profile-1/test5/?stream=1')
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), 1203)
+        self.assertEqual(data[:1000], self.client.get('/profile-1/test5/?page_size=1000').json()['results'])
+
+    def test_empty_list(self):
+        MyUser.objects.all().delete()
+        response = self.client.get('/profile-1/test5/?stream=1')
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+    def test_only_json_rows_are_streamed(self):
+        response = self.client.get('/profile-1/test5/?stream=1&shape=columns')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('shape', response.json())
+        response = self.client.get('/profile-1/test5/?stream=1', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 406)
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users({'username': f'user{i:03}'} for i in range(250))
+
+    def setUp(self):
+        caches['representations'].clear()
+
+    def test_forward_and_backward_traversal(self):
+        first = self.client.get('/profile-1/test5/').json()
+        self.assertIsNone(first['previous'])
+        self.assertEqual(len(first['results']), 100)
+        second = self.client.get(first['next']).json()
+        third = self.client.get(second['next']).json()
+        self.assertIsNone(third['next'])
+        self.assertEqual(len(third['results']), 50)
+        self.assertEqual(self.client.get(third['previous']).json()['results'], second['results'])
+        ids = [row['id'] for page in (first, second, third) for row in page['results']]
+        self.assertEqual(ids, sorted(MyUser.objects.values_list('id', flat=True)))
+
+    def test_username_ordering(self):
+        first = self.client.get('/profile-1/test5/', {'ordering': '-username', 'page_size': 10}).json()
+        second = self.client.get(first['next']).json()
+        usernames = [row['username'] for row in first['results'] + second['results']]
+        self.assertEqual(usernames, [f'user{i:03}' for i in range(249, 229, -1)])
+
+
+class RepresentationCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users({'username': f'user{i}', 'first_name': 'first'} for i in range(20))
+
+    def setUp(self):
+        caches['representations'].clear()
+        self.pks = list(MyUser.objects.order_by('id').values_list('id', flat=True))
+
+    def represent(self):
+        return cached_representations(
+            UserSerializer, {}, self.pks, lambda pks: MyUser.objects.select_related('my_profile').filter(pk__in=pks),
+        )
+
+    def test_hits_do_not_touch_the_database(self):
+        data = self.represent()
+        self.assertEqual(data, UserSerializer(MyUser.objects.order_by('id'), many=True).data)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.represent(), data)
+
+    def test_profile_save_invalidates_its_user(self):
+        self.represent()
+        profile = MyProfile.objects.get(my_user_id=self.pks[3])
+        profile.first_name = 'changed'
+        profile.save()
+        with self.assertNumQueries(3):
+            data = self.represent()
+        self.assertEqual(data[3]['my_profile']['first_name'], 'changed')
+
+    def test_friends_change_invalidates_both_sides(self):
+        self.represent()
+        MyUser.objects.get(pk=self.pks[0]).friends.add(self.pks[1])
+        with self.assertNumQueries(3) as queries:
+            self.represent()
+        self.assertIn(f'IN ({self.pks[0]}, {self.pks[1]})', queries.captured_queries[0]['sql'])
+
+    def test_viewset_list_serializes_only_misses(self):
+        first = self.client.get('/profile-1/test5/').json()
+        MyUser.objects.filter(pk=self.pks[5]).get().save()
+        with self.assertNumQueries(2):
+            second = self.client.get('/profile-1/test5/').json()
+        self.assertEqual(first, second)
+
+    def test_fragments_are_plain_data(self):
+        MyUser.objects.filter(pk=self.pks[0]).update(password='pbkdf2_sha256$1$salt$hash')
+        request = Request(RequestFactory().get('/'))
+
+        def represent():
+            return cached_representations(
+                UserHyperLinkSerializer, {'request': request}, self.pks[:1], lambda pks: MyUser.objects.filter(pk__in=pks),
+            )
+
+        represent()
+        with self.assertNumQueries(0):
+            fragment = represent()[0]
+        self.assertIs(type(fragment), dict)
+        self.assertIs(type(fragment['url']), str)
+        self.assertNotIn(b'pbkdf2_sha256', pickle.dumps(fragment))
+
+    def test_format_query_parameter_is_not_shared(self):
+        url = self.client.get('/profile-1/test5/?format=json').json()['results'][0]['url']
+        self.assertTrue(url.endswith('?format=json'))
+        data = self.client.get('/profile-1/test5/').json()
+        self.assertEqual(data['results'][0]['url'], url.removesuffix('?format=json'))
+
+
+class FriendsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = MyUser.objects.bulk_create_users({'username': f'user{i}'} for i in range(6))
+        a, b, c, d, e, f = cls.users
+        a.friends.add(b, c)
+        b.friends.add(d)
+        c.friends.add(d, e)
+
+    def setUp(self):
+        caches['representations'].clear()
+
+    def test_friends_field_is_batch_loaded(self):
+        with self.assertNumQueries(3):
+            data = UserSerializer(MyUser.objects.order_by('id'), many=True).data
+        a, b, c, d, e, f = self.users
+        self.assertEqual(data[0]['friends'], [b.pk, c.pk])
+        self.assertEqual(data[3]['friends'], [b.pk, c.pk])
+        self.assertEqual(data[5]['friends'], [])
+        self.assertEqual(UserSerializer(a).data['friends'], [b.pk, c.pk])
+
+    def test_friends_of_friends(self):
+        a, b, c, d, e, f = self.users
+        with self.assertNumQueries(1):
+            mutual_friends = dict(MyUser.objects.friends_of_friends(a.pk).values_list('pk', 'mutual_friends'))
+        self.assertEqual(mutual_friends, {d.pk: 2, e.pk: 1})
+        response = self.client.get(f'/profile-1/test5/{a.pk}/friends-of-friends/').json()
+        self.assertEqual([row['id'] for row in response['results']], [d.pk, e.pk])
+
+    def test_mutual_friends(self):
+        a, b, c, d, e, f = self.users
+        with self.assertNumQueries(1):
+            self.assertEqual(list(MyUser.objects.mutual_friends(a.pk, d.pk).order_by('pk')), [b, c])
+        response = self.client.get(f'/profile-1/test5/{a.pk}/mutual-friends/', {'with': e.pk}).json()
+        self.assertEqual([row['id'] for row in response['results']], [c.pk])
+
+    def test_unknown_user(self):
+        a = self.users[0]
+        missing = MyUser.objects.order_by('-pk').first().pk + 1
+        self.assertEqual(self.client.get(f'/profile-1/test5/{missing}/friends-of-friends/').status_code, 404)
+        self.assertEqual(self.client.get(f'/profile-1/test5/{missing}/mutual-friends/', {'with': a.pk}).status_code, 404)
+        self.assertEqual(self.client.get(f'/profile-1/test5/{a.pk}/mutual-friends/', {'with': missing}).status_code, 404)
+        self.assertEqual(self.client.get(f'/profile-1/test5/{a.pk}/mutual-friends/', {'with': 'x'}).status_code, 404)
+
+
+class ImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = MyUser.objects.bulk_create_users({'username': f'user{i}'} for i in range(3))
+        MyImage.objects.bulk_create(
+            MyImage(my_profile=user.my_profile, image=f'missing-{user.pk}-{i}.png', width=i, height=2 * i)
+            for user in cls.users for i in range(1, 3)
+        )
+
+    def test_images_are_batch_loaded_without_opening_files(self):
+        context = {'request': RequestFactory().get('/')}
+        with self.assertNumQueries(3):
+            data = UserSerializer(MyUser.objects.order_by('id'), many=True, context=context).data
+        pk = self.users[2].pk
+        self.assertEqual(data[2]['images'], [
+            {'image': f'http://testserver/missing-{pk}-1.png', 'width': 1, 'height': 2},
+            {'image': f'http://testserver/missing-{pk}-2.png', 'width': 2, 'height': 4},
+        ])
+
+    def test_rows_without_dimensions_do_not_open_files(self):
+        # what migration 0003 leaves behind for files it could not read
+        MyImage.objects.create(my_profile=self.users[0].my_profile, image='missing.png')
+        with self.assertNumQueries(3):
+            data = UserSerializer(MyUser.objects.order_by('id'), many=True, context={'request': RequestFactory().get('/')}).data
+        self.assertEqual(data[0]['images'][-1], {'image': 'http://testserver/missing.png', 'width': None, 'height': None})
+
+    def test_dimensions_are_stored_on_upload(self):
+        content = BytesIO()
+        Image.new('RGB', (12, 7)).save(content, 'PNG')
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            image = MyImage.objects.create(
+                my_profile=self.users[0].my_profile,
+                image=SimpleUploadedFile('upload.png', content.getvalue(), content_type='image/png'),
+            )
+        image = MyImage.objects.get(pk=image.pk)
+        self.assertEqual((image.width, image.height), (12, 7))
+
+    def test_non_image_upload_has_no_dimensions(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            image = MyImage.objects.create(
+                my_profile=self.users[0].my_profile,
+                image=SimpleUploadedFile('upload.png', b'not an image', content_type='image/png'),
+            )
+        image = MyImage.objects.get(pk=image.pk)
+        self.assertEqual((image.width, image.height), (None, None))
+
+
+class NestedUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users(
+            {'username': f'user{i}', 'first_name': f'first {i}', 'birthdate': '2000-01-01'} for i in range(5)
+        )
+        MyUser.objects.create(username='no_profile')
+
+    def test_update_writes_only_changed_columns(self):
+        user = MyUser.objects.select_related('my_profile').get(username='user0')
+        serializer = UserSerializer(user, data={'my_profile': {'last_name': 'last'}}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertNumQueries(3) as queries:
+            serializer.save()
+        update = queries.captured_queries[1]['sql']
+        self.assertTrue(update.startswith('UPDATE "profile_1_myprofile" SET "last_name"'))
+        self.assertNotIn('first_name', update)
+        self.assertEqual(MyProfile.objects.get(my_user=user).last_name, 'last')
+
+    def test_update_without_changes_skips_the_write(self):
+        user = MyUser.objects.select_related('my_profile').get(username='user1')
+        serializer = UserSerializer(user, data={'username': 'user1', 'my_profile': {'first_name': 'first 1'}})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertNumQueries(0):
+            serializer.save()
+
+    def test_update_creates_missing_profile(self):
+        user = MyUser.objects.get(username='no_profile')
+        serializer = UserSerializer(user, data={'my_profile': {'first_name': 'new'}}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(MyProfile.objects.get(my_user=user).first_name, 'new')
+
+    def test_bulk_partial_update(self):
+        users = MyUser.objects.filter(username__in=['user2', 'user3', 'user4']).order_by('id')
+        data = [
+            {'username': 'renamed2'},
+            {'my_profile': {'birthdate': '1999-12-31'}},
+            {'username': 'user4'},
+        ]
+        serializer = UserSerializer(users, data=data, many=True, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertNumQueries(4) as queries:
+            serializer.save()
+        self.assertEqual(
+            [query['sql'].split(' SET ')[0] for query in queries.captured_queries[1:3]],
+            ['UPDATE "profile_1_myuser"', 'UPDATE "profile_1_myprofile"'],
+        )
+        self.assertEqual(
+            list(MyUser.objects.order_by('id').values_list('username', 'my_profile__birthdate'))[2:5],
+            [('renamed2', date(2000, 1, 1)), ('user3', date(1999, 12, 31)), ('user4', date(2000, 1, 1))],
+        )
+
+    def test_bulk_update_needs_one_item_per_instance(self):
+        serializer = UserSerializer(MyUser.objects.all(), data=[{}], many=True, partial=True)
+        self.assertFalse(serializer.is_valid())
+
+
+class CachedFieldsTests(TestCase):
+    def test_fields_are_cloned_from_a_class_template(self):
+        first, second = UserSerializer(), UserSerializer()
+        first.fields  # built lazily
+        template = UserSerializer._fields_template
+        for field_name in ['username', 'my_profile', 'friends']:
+            self.assertIsNot(first.fields[field_name], second.fields[field_name])
+            self.assertIs(first.fields[field_name].parent, first)
+            self.assertIsNone(template[field_name].parent)
+        self.assertIsNot(first.fields['my_profile'].fields['birthdate'], second.fields['my_profile'].fields['birthdate'])
+
+    def test_unique_validator_still_runs(self):
+        MyUser.objects.create(username='taken')
+        for _ in range(2):
+            serializer = UserSerializer(data={'username': 'taken'})
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(serializer.errors['username'][0].code, 'unique')
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users(
+            {'username': f'user{i}', 'first_name': 'first', 'birthdate': '2000-01-01'} for i in range(5)
+        )
+
+    def setUp(self):
+        caches['representations'].clear()
+
+    def test_parse_field_selection(self):
+        self.assertEqual(
+            parse_field_selection('username, my_profile.birthdate,my_profile.first_name'),
+            {'username': None, 'my_profile': {'birthdate': None, 'first_name': None}},
+        )
+        self.assertEqual(parse_field_selection('my_profile,my_profile.birthdate'), {'my_profile': None})
+        self.assertIsNone(parse_field_selection(''))
+
+    def test_selected_fields_and_columns(self):
+        fields = parse_field_selection('username,my_profile.birthdate')
+        queryset = UserSerializer.setup_eager_loading(MyUser.objects.order_by('id'), fields)
+        with self.assertNumQueries(1) as queries:
+            data = UserSerializer(queryset, many=True, context={'fields': fields}).data
+        self.assertEqual(dict(data[0]['my_profile']), {'birthdate': '2000-01-01'})
+        self.assertEqual(list(data[0])[:2], ['username', 'my_profile'])
+        self.assertNotIn('friends', data[0])
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"birthdate"', sql)
+        self.assertNotIn('"first_name"', sql)
+        self.assertNotIn('"password"', sql)
+
+    def test_unselected_relations_are_not_joined(self):
+        queryset = UserSerializer.setup_eager_loading(MyUser.objects.order_by('id'), {'username': None})
+        with self.assertNumQueries(1) as queries:
+            data = UserSerializer(queryset, many=True, context={'fields': {'username': None}}).data
+        self.assertEqual(data[0]['username'], 'user0')
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+
+    def test_compiled_list_with_selection(self):
+        fields = {'my_profile': {'first_name': None}}
+        data = CompiledUserSerializer(MyUser.objects.order_by('id'), many=True, context={'fields': fields}).data
+        self.assertEqual(data[0]['my_profile'], {'first_name': 'first'})
+        self.assertNotIn('username', data[0])
+
+    def test_viewset(self):
+        data = self.client.get('/profile-1/test5/?fields=username&ordering=-username').json()
+        self.assertEqual(data['results'][0], {'username': 'user4'})
+        full = self.client.get('/profile-1/test5/?ordering=-username').json()
+        self.assertEqual(set(full['results'][0]), {'id', 'username', 'url'})
+        with self.assertNumQueries(1) as queries:
+            data = self.client.get('/profile-1/test5/?fields=id&stream=1')
+            data = json.loads(b''.join(data.streaming_content))
+        self.assertEqual(data[0], {'id': MyUser.objects.order_by('id')[0].pk})
+        self.assertNotIn('username', queries.captured_queries[0]['sql'])
+
+    def test_unknown_field(self):
+        response = self.client.get('/profile-1/test5/?fields=username,password,nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Unknown field: password', 'Unknown field: nope']})
+
+
+class ReversingUserHyperLinkSerializer(UserHyperLinkSerializer):
+    serializer_url_field = serializers.HyperlinkedIdentityField
+
+
+class UrlTemplateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users({'username': f'user{i}'} for i in range(3))
+
+    def render(self, serializer_class, path='/', **context):
+        request = Request(RequestFactory().get(path))
+        users = MyUser.objects.order_by('id')
+        return serializer_class(users, many=True, context={'request': request, **context}).data
+
+    def test_same_urls_as_reverse(self):
+        data = self.render(UserHyperLinkSerializer)
+        self.assertEqual(data, self.render(ReversingUserHyperLinkSerializer))
+        self.assertEqual(data[0]['url'], f'http://testserver/profile-1/test5/{data[0]["id"]}/')
+        self.assertEqual(data[0]['url'].obj.pk, data[0]['id'])
+
+    def test_format_query_parameter_is_kept(self):
+        for path in ['/?format=json', '/?format=msgpack&page_size=10', '/?page_size=10']:
+            data = self.render(UserHyperLinkSerializer, path)
+            self.assertEqual(data, self.render(ReversingUserHyperLinkSerializer, path))
+        self.assertTrue(self.render(UserHyperLinkSerializer, '/?format=json')[0]['url'].endswith('/?format=json'))
+
+    def test_format_suffix_falls_back_to_reverse(self):
+        self.assertEqual(
+            self.render(UserHyperLinkSerializer, format='json'),
+            self.render(ReversingUserHyperLinkSerializer, format='json'),
+        )
+
+
+class MemoizedProfileSerializer(ProfileSerializer):
+    # own class, own caches
+    pass
+
+
+class MemoizedValidationTests(TestCase):
+    def setUp(self):
+        MemoizedProfileSerializer.clear_validation_cache()
+
+    def test_repeated_values_are_parsed_once(self):
+        data = [{'first_name': 'first', 'birthdate': '2000-01-0' + str(i % 2 + 1)} for i in range(10)]
+        serializer = MemoizedProfileSerializer(data=data, many=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data[1]['birthdate'], date(2000, 1, 2))
+        info = MemoizedProfileSerializer.validation_cache_info()
+        self.assertEqual((info['birthdate'].hits, info['birthdate'].misses), (8, 2))
+        self.assertEqual((info['first_name'].hits, info['first_name'].misses), (9, 1))
+
+    def test_errors_are_memoized(self):
+        for _ in range(2):
+            serializer = MemoizedProfileSerializer(data={'birthdate': 'not a date', 'first_name': 'x' * 256})
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(serializer.errors['birthdate'][0].code, 'invalid')
+            self.assertEqual(serializer.errors['first_name'][0].code, 'max_length')
+        self.assertEqual(MemoizedProfileSerializer.validation_cache_info()['birthdate'].hits, 1)
+
+    def test_empty_values_are_not_memoized(self):
+        serializer = MemoizedProfileSerializer(data={'first_name': None})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(MemoizedProfileSerializer.validation_cache_info()['first_name'].misses, 0)
+
+    def test_database_and_password_fields_are_not_memoizable(self):
+        fields = UserSerializer().fields
+        self.assertFalse(is_memoizable(fields['username']))
+        self.assertFalse(is_memoizable(fields['password']))
+        self.assertTrue(is_memoizable(fields['my_profile'].fields['birthdate']))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkCreateTests(TestCase):
+    def test_two_inserts_in_one_transaction(self):
+        data = [
+            {'username': f'bulk{i}', 'password': 'secret', 'my_profile': {'first_name': f'first {i}', 'birthdate': '2000-01-02'}}
+            for i in range(5)
+        ] + [{'username': 'no_profile'}]
+        serializer = UserSerializer(data=data, many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertNumQueries(4) as queries:
+            users = serializer.save()
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertTrue(sql[0].startswith('SAVEPOINT'))
+        self.assertIn('INSERT INTO "profile_1_myuser"', sql[1])
+        self.assertIn('INSERT INTO "profile_1_myprofile"', sql[2])
+        self.assertTrue(sql[3].startswith('RELEASE SAVEPOINT'))
+        self.assertEqual([user.username for user in users], [item['username'] for item in data])
+        user = MyUser.objects.select_related('my_profile').get(username='bulk3')
+        self.assertEqual((user.my_profile.first_name, user.my_profile.birthdate), ('first 3', date(2000, 1, 2)))
+        self.assertTrue(user.check_password('secret'))
+        self.assertIsNone(MyUser.objects.select_related('my_profile').get(username='no_profile').my_profile.first_name)
+
+    def test_per_row_errors_are_unchanged(self):
+        data = [
+            {'username': 'fine'},
+            {'password': 'no username'},
+            {'username': 'bad date', 'my_profile': {'birthdate': 'never'}},
+            {'username': 'long', 'my_profile': {'first_name': 'x' * 256}},
+        ]
+        serializer = UserSerializer(data=data, many=True)
+        self.assertFalse(serializer.is_valid())
+        for item, errors in zip(data, serializer.errors):
+            single = UserSerializer(data=item)
+            single.is_valid()
+            self.assertEqual(errors, single.errors)
+        self.assertFalse(MyUser.objects.exists())
+
+
+class MakePasswordsTests(SimpleTestCase):
+    def assertHashes(self, raw_passwords, hashed):
+        self.assertEqual(len(hashed), len(raw_passwords))
+        for raw_password, encoded in zip(raw_passwords, hashed):
+            self.assertTrue(check_password(raw_password, encoded))
+        # algorithm$iterations$salt$hash
+        self.assertEqual(len({encoded.split('$')[2] for encoded in hashed}), len(hashed))
+
+    def test_process_pool(self):
+        self.addCleanup(hashers.shutdown_executors)
+        raw_passwords = ['secret', 'secret', 'other', 'secret']
+        with mock.patch.object(hashers, 'get_executor', wraps=hashers.get_executor) as get_executor:
+            hashed = hashers.make_passwords(raw_passwords, workers=2, parallel_min=0)
+        get_executor.assert_called_once_with(2)
+        self.assertHashes(raw_passwords, hashed)
+
+    def test_serial_below_parallel_min(self):
+        raw_passwords = ['secret', 'secret']
+        with mock.patch.object(hashers, 'get_executor') as get_executor:
+            with self.settings(PASSWORD_HASH_PARALLEL_MIN=16):
+                hashed = hashers.make_passwords(raw_passwords, workers=2)
+            self.assertHashes(raw_passwords, hashed)
+            hashers.make_passwords(raw_passwords, workers=1, parallel_min=0)
+        get_executor.assert_not_called()
+
+
+class BatchedUniqueValidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users({'username': f'user{i}'} for i in range(3))
+
+    def test_one_query_per_chunk(self):
+        data = [{'username': f'new{i}'} for i in range(20)]
+        serializer = UserSerializer(data=data, many=True)
+        with self.settings(USER_UNIQUE_CHECK_CHUNK_SIZE=8), self.assertNumQueries(3):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_errors_match_the_per_item_validator(self):
+        data = [
+            {'username': 'new0'},
+            {'username': 'user1'},
+            {'username': 'new0'},
+            {'username': 'user2', 'my_profile': {'birthdate': 'never'}},
+            {'username': 'bad name!'},
+        ]
+        serializer = UserSerializer(data=data, many=True)
+        self.assertFalse(serializer.is_valid())
+        single = UserSerializer(data={'username': 'user1'})
+        single.is_valid()
+        self.assertEqual(serializer.errors[0], {})
+        self.assertEqual(serializer.errors[1], single.errors)
+        self.assertEqual(serializer.errors[2], single.errors)
+        self.assertEqual(list(serializer.errors[3]), ['username', 'my_profile'])
+        self.assertEqual(serializer.errors[3]['username'][0].code, 'unique')
+        self.assertEqual([error.code for error in serializer.errors[4]['username']], ['invalid'])
+        self.assertEqual(len(UserSerializer().fields['username'].validators), len(serializer.child.fields['username'].validators))
+
+    def test_update_excludes_the_paired_instance(self):
+        users = MyUser.objects.filter(username__in=['user0', 'user1']).order_by('id')
+        serializer = UserSerializer(users, data=[{'username': 'user0'}, {'username': 'user2'}], many=True, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertEqual(serializer.errors[1]['username'][0].code, 'unique')
+
+
+class AsyncSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users({'username': f'user{i}', 'first_name': f'first {i}'} for i in range(3))
+
+    def setUp(self):
+        caches['representations'].clear()
+
+    async def test_create_and_represent(self):
+        serializer = UserSerializer(data={'username': 'new', 'password': 'secret', 'my_profile': {'last_name': 'last'}})
+        self.assertTrue(await serializer.ais_valid())
+        user = await serializer.asave()
+        data = await serializer.adata()
+        self.assertEqual(data['my_profile'], {'first_name': None, 'last_name': 'last', 'birthdate': None})
+        self.assertEqual((data['images'], data['friends']), ([], []))
+        self.assertTrue(await MyUser.objects.filter(pk=user.pk, my_profile__last_name='last').aexists())
+
+    async def test_unique_error_matches_is_valid(self):
+        serializer = UserSerializer(data={'username': 'user0'})
+        self.assertFalse(await serializer.ais_valid())
+        single = UserSerializer(data={'username': 'user0'})
+        await sync_to_async(single.is_valid)()
+        self.assertEqual(serializer.errors, single.errors)
+
+    async def test_update(self):
+        user = await UserSerializer.setup_eager_loading(MyUser.objects.all()).aget(username='user1')
+        serializer = UserSerializer(user, data={'my_profile': {'first_name': 'renamed'}}, partial=True)
+        self.assertTrue(await serializer.ais_valid())
+        await serializer.asave()
+        self.assertEqual((await MyProfile.objects.aget(my_user=user)).first_name, 'renamed')
+
+    async def test_list_data(self):
+        data = await UserSerializer(MyUser.objects.order_by('id'), many=True).adata()
+        self.assertEqual([item['username'] for item in data], ['user0', 'user1', 'user2'])
+
+    async def test_async_viewset(self):
+        response = await self.async_client.get('/profile-1/test5-async/')
+        self.assertEqual(
+            response.json()['results'],
+            (await self.async_client.get('/profile-1/test5/')).json()['results'],
+        )
+        response = await self.async_client.post('/profile-1/test5-async/', {'username': 'async'})
+        self.assertEqual(response.status_code, 201)
+        url = f'/profile-1/test5-async/{response.json()["id"]}/'
+        response = await self.async_client.patch(url, {'username': 'renamed'}, content_type='application/json')
+        self.assertEqual(response.json()['username'], 'renamed')
+        response = await self.async_client.post('/profile-1/test5-async/', {'username': 'renamed'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await self.async_client.delete(url)).status_code, 204)
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+
+class GetOrCreateUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users([{'username': 'existing', 'first_name': 'first'}])
+
+    def test_existing_user_is_one_query(self):
+        with self.assertNumQueries(1):
+            user = MyUser.objects.get_or_create_user('existing')
+            self.assertEqual(user.my_profile.first_name, 'first')
+
+    def test_batched_variant(self):
+        data = [{'username': 'new0', 'last_name': 'last'}, {'username': 'existing'}, {'username': 'new1'}]
+        with self.assertNumQueries(6):
+            users = MyUser.objects.get_or_create_users(data)
+        self.assertEqual([user.username for user in users], ['new0', 'existing', 'new1'])
+        self.assertEqual(users[0].my_profile.last_name, 'last')
+        self.assertEqual(MyProfile.objects.filter(my_user__in=users).count(), 3)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConcurrentGetOrCreateUserTests(TransactionTestCase):
+    def test_threads_creating_the_same_usernames(self):
+        usernames = [f'user{i}' for i in range(5)]
+        results = []
+        errors = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            try:
+                barrier.wait()
+                for username in usernames:
+                    results.append(MyUser.objects.get_or_create_user(username).pk)
+                results.extend(user.pk for user in MyUser.objects.get_or_create_users({'username': u} for u in usernames))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(results)), 5)
+        self.assertEqual(MyUser.objects.count(), 5)
+        self.assertEqual(MyProfile.objects.count(), 5)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+class SQLitePragmaTests(TestCase):
+    def get_pragmas(self, **overrides):
+        """
+        PRAGMA values of a new connection to a scratch database file, opened with the given settings.
+        """
+        with tempfile.TemporaryDirectory() as directory, self.settings(**overrides):
+            scratch = type(connections['default'])({**connection.settings_dict, 'NAME': f'{directory}/scratch.sqlite3'}, 'scratch')
+            try:
+                with scratch.cursor() as cursor:
+                    pragmas = {}
+                    for name in ['journal_mode', 'synchronous', 'busy_timeout']:
+                        cursor.execute(f'PRAGMA {name}')
+                        pragmas[name] = cursor.fetchone()[0]
+            finally:
+                scratch.close()
+        return pragmas
+
+    @skipIf(settings.DB_TUNED, 'running with DB_TUNED=1')
+    def test_off_by_default(self):
+        self.assertEqual(settings.SQLITE_PRAGMAS, {})
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+        self.assertEqual(self.get_pragmas()['journal_mode'], 'delete')
+
+    def test_new_connections_are_tuned(self):
+        pragmas = self.get_pragmas(SQLITE_PRAGMAS=settings.TUNED_SQLITE_PRAGMAS)
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000})
+
+
+class ExportUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users([
+            {'username': 'user0', 'first_name': 'first', 'birthdate': '2000-01-02'},
+            {'username': 'user1', 'last_name': 'last, "quoted"'},
+        ])
+        MyUser.objects.create(username='no_profile')
+
+    def export(self, export_format):
+        output = StringIO()
+        call_command('export_users', format=export_format, chunk_size=2, stdout=output, stderr=StringIO())
+        return output.getvalue()
+
+    def test_csv(self):
+        self.assertEqual(self.export('csv').splitlines(), [
+            'username,my_profile.first_name,my_profile.last_name,my_profile.birthdate',
+            'user0,first,,2000-01-02',
+            'user1,,"last, ""quoted""",',
+            'no_profile,,,',
+        ])
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(rows[0], {
+            'username': 'user0', 'my_profile.first_name': 'first', 'my_profile.last_name': None,
+            'my_profile.birthdate': '2000-01-02',
+        })
+        self.assertEqual([row['username'] for row in rows], ['user0', 'user1', 'no_profile'])
+
+
+@override_settings(USER_IMPORT_BATCH_SIZE=2)
+class UserImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.create(username='taken')
+        cls.admin = MyUser.objects.create(username='admin', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post(self, lines, query=''):
+        body = ''.join(f'{line}\n' for line in lines).encode()
+        response = self.client.post(f'/profile-1/user-import/{query}', body, content_type='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_import_in_batches(self):
+        records = self.post([
+            json.dumps({'username': 'new0', 'my_profile': {'first_name': 'first'}}),
+            json.dumps({'username': 'taken'}),
+            '',
+            '{not json',
+            json.dumps({'username': 'new1'}),
+            json.dumps({'username': 'new1'}),
+        ], '?verbose=1')
+        new0 = MyUser.objects.get(username='new0')
+        self.assertEqual(new0.my_profile.first_name, 'first')
+        self.assertEqual(records[0], {'line': 1, 'id': new0.pk})
+        self.assertEqual(records[1]['line'], 2)
+        self.assertEqual(records[1]['errors']['username'], ['A user with that username already exists.'])
+        self.assertEqual(records[2], {'committed': 2, 'created': 1, 'failed': 1})
+        self.assertEqual(records[3]['line'], 4)
+        self.assertEqual(records[4]['line'], 5)
+        self.assertEqual(records[5], {'committed': 5, 'created': 2, 'failed': 2})
+        self.assertEqual(records[6]['line'], 6)
+        self.assertEqual(records[-1], {'done': True, 'committed': 6, 'created': 2, 'failed': 3})
+
+    def test_admin_only(self):
+        body = json.dumps({'username': 'anonymous'}).encode()
+        self.client.logout()
+        response = self.client.post('/profile-1/user-import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(MyUser.objects.get(username='taken'))
+        response = self.client.post('/profile-1/user-import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(MyUser.objects.filter(username='anonymous').exists())
+
+    def test_body_that_can_not_be_read(self):
+        # a chunked upload has no Content-Length
+        request = RequestFactory().post('/profile-1/user-import/', b'{"username": "a"}\n', content_type='application/x-ndjson')
+        del request.META['CONTENT_LENGTH']
+        force_authenticate(request, self.admin)
+        self.assertEqual(UserImportView.as_view()(request).status_code, 411)
+        response = self.client.post('/profile-1/user-import/', b'', content_type='application/x-ndjson', CONTENT_LENGTH='0')
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_insert_is_validated_again(self):
+        create = UserListSerializer.create
+        calls = []
+
+        def racing_create(serializer, validated_data):
+            calls.append(1)
+            if len(calls) == 1:
+                # another import commits 'race' between validation and insert
+                MyUser.objects.create(username='race')
+                raise IntegrityError('UNIQUE constraint failed: profile_1_myuser.username')
+            return create(serializer, validated_data)
+
+        with mock.patch.object(UserListSerializer, 'create', racing_create):
+            records = self.post([json.dumps({'username': 'race'}), json.dumps({'username': 'other'})])
+        self.assertEqual(records[0]['line'], 1)
+        self.assertEqual(records[0]['errors']['username'], ['A user with that username already exists.'])
+        self.assertEqual(records[-1], {'done': True, 'committed': 2, 'created': 1, 'failed': 1})
+        self.assertTrue(MyUser.objects.filter(username='other').exists())
+
+    def test_conflicting_batch_is_reported(self):
+        with mock.patch.object(UserListSerializer, 'create', side_effect=IntegrityError('conflict')):
+            records = self.post([json.dumps({'username': 'a'}), json.dumps({'username': 'b'})])
+        self.assertEqual([record['line'] for record in records[:2]], [1, 2])
+        self.assertIn('rolled back', records[0]['errors']['non_field_errors'][0])
+        self.assertEqual(records[2], {'committed': 2, 'created': 0, 'failed': 2})
+        self.assertEqual(records[-1], {'done': True, 'committed': 2, 'created': 0, 'failed': 2})
+
+    def test_resume_after_the_last_committed_line(self):
+        lines = [json.dumps({'username': f'user{i}'}) for i in range(5)]
+        records = self.post(lines, '?skip=3')
+        self.assertEqual(records[-1], {'done': True, 'committed': 5, 'created': 2, 'failed': 0})
+        self.assertEqual(list(MyUser.objects.filter(username__startswith='user').values_list('username', flat=True)), ['user3', 'user4'])
+
+
+class FastJSONTests(TestCase):
+    data = ReturnList([
+        ReturnDict({
+            'url': Hyperlink('http://testserver/profile-1/test5/1/', None),
+            'birthdate': date(2000, 1, 2),
+            'joined': datetime(2023, 9, 16, 12, 30, 1, 5, tzinfo=timezone.utc),
+            'amount': Decimal('1.50'),
+            'error': ErrorDetail('bad', code='invalid'),
+            'name': 'na\u2028me \u00e9',
+            1: None,
+        }, serializer=None),
+    ], serializer=None)
+
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_and_fallback(self):
+        for accepted_media_type in ['application/json; indent=2', None]:
+            with mock.patch.object(renderers, 'orjson', None):
+                self.assertEqual(
+                    FastJSONRenderer().render(self.data, accepted_media_type),
+                    JSONRenderer().render(self.data, accepted_media_type),
+                )
+
+    def test_parser(self):
+        body = '{"username": "na\u00efve", "n": [1, 2.5, null]}'.encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"a": NaN}'))
+
+    def test_api(self):
+        response = self.client.post(
+            '/profile-1/test5/', json.dumps({'username': 'fast'}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['username'], 'fast')
+        response = self.client.post('/profile-1/test5/', '{"username": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(msgpack is not None, 'needs msgpack')
+class MessagePackTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        MyUser.objects.bulk_create_users(
+            {'username': f'user{i}', 'first_name': 'first', 'birthdate': '2000-01-02'} for i in range(3)
+        )
+
+    def setUp(self):
+        caches['representations'].clear()
+
+    def unpack(self, response):
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        return MessagePackParser().parse(BytesIO(response.content))
+
+    def test_native_dates(self):
+        users = MyUser.objects.order_by('id')
+        data = UserSerializer(users, many=True, context={'native_dates': True}).data
+        self.assertEqual(data[0]['my_profile']['birthdate'], date(2000, 1, 2))
+        joined = datetime(2023, 9, 16, 12, 30, tzinfo=timezone.utc)
+        packed = MessagePackRenderer().render({'users': data, 'joined': joined})
+        self.assertLess(len(packed), len(JSONRenderer().render(UserSerializer(users, many=True).data)))
+        unpacked = MessagePackParser().parse(BytesIO(packed))
+        self.assertEqual(unpacked['users'][0]['my_profile']['birthdate'], date(2000, 1, 2))
+        self.assertEqual(unpacked['joined'], joined)
+        serializer = ProfileSerializer(data=unpacked['users'][0]['my_profile'])
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_negotiation(self):
+        json_data = self.client.get('/profile-1/test5/').json()
+        data = self.unpack(self.client.get('/profile-1/test5/', HTTP_ACCEPT='application/msgpack'))
+        self.assertEqual(data, json_data)
+        data = self.unpack(self.client.get('/profile-1/test5/?format=msgpack'))
+        # hyperlinks keep ?format=
+        self.assertEqual(
+            data['results'],
+            [{**row, 'url': f'{row["url"]}?format=msgpack'} for row in json_data['results']],
+        )
+
+    def test_columns(self):
+        rows = self.client.get('/profile-1/test5/').json()['results']
+        data = self.unpack(self.client.get('/profile-1/test5/?shape=columns', HTTP_ACCEPT='application/msgpack'))
+        self.assertEqual(data['results']['columns'], ['id', 'username', 'url'])
+        self.assertEqual(data['results']['rows'], [[row['id'], row['username'], row['url']] for row in rows])
+        data = self.client.get('/profile-1/test5/?shape=columns&fields=username').json()
+        self.assertEqual(data['results'], {'columns': ['username'], 'rows': [['user0'], ['user1'], ['user2']]})
+
+    def test_streamed_list_is_not_sent_as_json(self):
+        response = self.client.get('/profile-1/test5/?format=msgpack&stream=1')
+        self.assertEqual(response.status_code, 406)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+
+    def test_msgpack_body(self):
+        body = MessagePackRenderer().render({'username': 'packed'})
+        response = self.client.post('/profile-1/test5/', body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['username'], 'packed')
+        response = self.client.post('/profile-1/test5/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+def make_hooks():
+    """
+    A serializer-like class with two nested start_end_log hooks, decorated under the current settings.
+    """
+    class Hooks:
+        @logs.start_end_log
+        @logs.message_log('outer')
+        def to_representation(self, count):
+            return [self.to_internal_value() for _ in range(count)]
+
+        @logs.start_end_log
+        @logs.message_log('inner')
+        def to_internal_value(self):
+            return 1
+
+    return Hooks
+
+
+class StartEndLogTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(logs, '_spans', deque())
+        self.spans = patcher.start()
+        self.addCleanup(patcher.stop)
+        # samples of the real serializer hooks, when SERIALIZER_PROFILE is on
+        logs.reset_profile()
+        self.addCleanup(logs.reset_profile)
+
+    def test_disabled_hook_is_not_wrapped(self):
+        def hook(self):
+            pass
+
+        with self.settings(SERIALIZER_TRACE=False, SERIALIZER_PROFILE=False):
+            self.assertIs(logs.start_end_log(hook), hook)
+        with self.settings(SERIALIZER_TRACE=False, SERIALIZER_PROFILE=True):
+            self.assertIsNot(logs.start_end_log(hook), hook)
+
+    @override_settings(SERIALIZER_TRACE=True, SERIALIZER_TRACE_FLUSH_SIZE=4)
+    def test_spans(self):
+        hooks = make_hooks()()
+        with self.assertNoLogs('profile_1.trace', 'DEBUG'):
+            hooks.to_representation(2)
+        self.assertEqual(
+            [(span.name, span.tag, span.depth) for span in self.spans],
+            [('to_internal_value', 'inner', 1), ('to_internal_value', 'inner', 1), ('to_representation', 'outer', 0)],
+        )
+        # the fourth span reaches the flush size: a single record with every buffered span, in start order
+        with self.assertLogs('profile_1.trace', 'DEBUG') as captured:
+            hooks.to_internal_value()
+        self.assertEqual(len(captured.records), 1)
+        lines = captured.records[0].getMessage().split('\n')
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('[to_representation - outer] '))
+        self.assertTrue(lines[1].startswith('  [to_internal_value - inner] '))
+        self.assertFalse(self.spans)
+        self.assertEqual(logs.flush_spans(), [])
+
+    @override_settings(SERIALIZER_TRACE=True)
+    def test_level_log_indents_outermost_spans(self):
+        Hooks = make_hooks()
+
+        class NestedHooks(Hooks):
+            @logs.start_end_log
+            @logs.message_log('nested')
+            @logs.level_log(1)
+            def validate(self, count):
+                return self.to_representation(count)
+
+        hooks = NestedHooks()
+        hooks.validate(1)
+        # the level applies outside any traced call, inside one the span nests one level below it
+        hooks.to_representation(0)
+        with mock.patch.object(logs, 'logger') as logger:
+            logs.flush_spans()
+        lines = [line.split(']')[0] + ']' for line in logger.debug.call_args[0][0].split('\n')]
+        self.assertEqual(lines, [
+            '  [validate - nested]',
+            '    [to_representation - outer]',
+            '      [to_internal_value - inner]',
+            '[to_representation - outer]',
+        ])
+
+    def test_percentile(self):
+        stats = logs.HookStats()
+        # 90 calls in the 1us bucket, 9 in the 1ms bucket (<= 1.024ms), one 5ms call
+        for duration in [0.000001] * 90 + [0.001] * 9 + [0.005]:
+            stats.record(duration)
+        self.assertEqual(stats.count, 100)
+        self.assertEqual(stats.percentile(0), 0.000001)
+        self.assertEqual(stats.percentile(50), 0.000001)
+        self.assertEqual(stats.percentile(90), 0.000001)
+        self.assertEqual(stats.percentile(95), 0.001024)
+        self.assertEqual(stats.percentile(99), 0.001024)
+        # the last bucket is capped at the slowest call
+        self.assertEqual(stats.percentile(100), 0.005)
+        self.assertEqual(logs.HookStats().percentile(50), 0.0)
+
+    @override_settings(SERIALIZER_TRACE=False, SERIALIZER_PROFILE=True)
+    def test_profile_report(self):
+        make_hooks()().to_representation(3)
+        report = {row['hook']: row for row in logs.profile_report()}
+        self.assertEqual(report['to_representation']['count'], 1)
+        self.assertEqual(report['to_internal_value']['count'], 3)
+        self.assertEqual(report['to_internal_value']['serializer'], 'Hooks')
+        self.assertEqual(report['to_internal_value']['tag'], 'inner')
+        # profiling alone does not buffer spans
+        self.assertFalse(self.spans)
+
+
+class SerializerProfileViewTests(TestCase):
+    url = '/profile-1/serializer-profile/'
+
+    def setUp(self):
+        logs.reset_profile()
+        self.addCleanup(logs.reset_profile)
+        logs.get_hook_stats('UserSerializer', '', 'to_representation').record(0.001)
+
+    def test_admin_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(MyUser.objects.create(username='user'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+        self.assertEqual(len(logs.profile_report()), 1)
+
+    @override_settings(SERIALIZER_PROFILE=False)
+    def test_report_and_reset(self):
+        self.client.force_login(MyUser.objects.create(username='admin', is_staff=True))
+        data = self.client.get(self.url).json()
+        self.assertFalse(data['enabled'])
+        self.assertEqual(len(data['hooks']), 1)
+        self.assertEqual(data['hooks'][0]['hook'], 'to_representation')
+        self.assertEqual(data['hooks'][0]['count'], 1)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.client.get(self.url).json()['hooks'], [])
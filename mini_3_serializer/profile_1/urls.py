@@ -1,11 +1,13 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from profile_1.views import UserHyperLinkViewSet
+from profile_1.views import AsyncUserHyperLinkViewSet, UserHyperLinkViewSet, UserImportView, SerializerProfileView
 
 router = DefaultRouter()
 router.register('test5', UserHyperLinkViewSet, )
+router.register('test5-async', AsyncUserHyperLinkViewSet, basename='myuser-async')
 
 urlpatterns = [
-
+    path('serializer-profile/', SerializerProfileView.as_view(), name='serializer-profile'),
+    path('user-import/', UserImportView.as_view(), name='user-import'),
 ] + router.urls
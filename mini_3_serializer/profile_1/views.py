@@ -1,13 +1,355 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
 from django.shortcuts import render
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable, NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
+from profile_1.caching import cached_representations
+from profile_1.fieldsets import get_unknown_fields, parse_field_selection
+from profile_1.importing import get_import_batch_size, streaming_import_response
+from profile_1.logs import profile_report, profiling_enabled, reset_profile
 from profile_1.models import MyUser
-from profile_1.serializers import UserHyperLinkSerializer
+from profile_1.pagination import UserCursorPagination
+from profile_1.parsers import MessagePackParser
+from profile_1.renderers import MessagePackRenderer, msgpack
+from profile_1.serializers import UserHyperLinkSerializer, get_ordering_paths
+from profile_1.streaming import streaming_json_response
+
+
+class EagerLoadingViewSetMixin:
+    """
+    Narrows the viewset queryset with the serializer's declared select_related / prefetch_related paths,
+    for the request's field selection if there is one.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, self.get_field_selection())
+        return queryset
+
+    def get_field_selection(self):
+        return None
+
+
+class SparseFieldsViewSetMixin:
+    """
+    `?fields=username,my_profile.birthdate` on reads renders only those fields (see profile_1/fieldsets.py):
+    the selection goes to the serializer through the context, and with EagerLoadingViewSetMixin
+    the queryset only joins and loads what the selected fields need.
+    """
+    fields_query_param = 'fields'
+
+    def get_field_selection(self):
+        if not hasattr(self, '_field_selection'):
+            self._field_selection = None
+            if self.request is not None and self.request.method in SAFE_METHODS:
+                selection = parse_field_selection(self.request.query_params.get(self.fields_query_param, ''))
+                if selection is not None:
+                    unknown = get_unknown_fields(self.get_serializer_class()(), selection)
+                    if unknown:
+                        raise ValidationError({self.fields_query_param: [f'Unknown field: {path}' for path in unknown]})
+                self._field_selection = selection
+        return self._field_selection
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_field_selection()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        only, defer = queryset.query.deferred_loading
+        if only and not defer:
+            # ?ordering= is applied after .only(), pagination reads the ordering columns
+            queryset = queryset.only(*only, *get_ordering_paths(queryset))
+        return queryset
+
+
+class StreamingListMixin:
+    """
+    `?stream=1` writes the list as a JSON array incrementally, serializing `stream_chunk_size` rows at a time.
+    only when JSON was negotiated (406 otherwise), and not with ColumnarListMixin's ?shape= (400).
+    """
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('stream') not in ('1', 'true'):
+            return super().list(request, *args, **kwargs)
+        if request.accepted_renderer.media_type != 'application/json':
+            raise NotAcceptable('Streamed lists (?stream=1) are only available as application/json.')
+        shape_query_param = getattr(self, 'shape_query_param', None)
+        if shape_query_param and shape_query_param in request.query_params:
+            raise ValidationError({shape_query_param: 'Can not be combined with ?stream=1.'})
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_json_response(
+            request._request, self.get_serializer_class(), queryset, self.get_serializer_context(), self.stream_chunk_size,
+        )
+
+
+class CachedListMixin:
+    """
+    Builds list responses from cached per-instance representations (see profile_1/caching.py).
+    the page is first fetched as bare keys, then only the cache misses are loaded and serialized.
+    """
+    cache_representations = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.cache_representations:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = [field.lstrip('-') for field in queryset.query.order_by]
+        keys = queryset.select_related(None).prefetch_related(None).only('pk', *ordering)
+        page = self.paginate_queryset(keys)
+        data = cached_representations(
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            [instance.pk for instance in (keys if page is None else page)],
+            lambda pks: queryset.filter(pk__in=pks),
+        )
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class MessagePackViewSetMixin:
+    """
+    Negotiates MessagePack (Accept: application/msgpack or ?format=msgpack, Content-Type: application/msgpack)
+    next to the configured renderers and parsers, when msgpack is installed. serializers get
+    context['native_dates'] for it, so dates are packed natively (see profile_1/renderers.py).
+    """
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if msgpack is not None:
+            renderers.append(MessagePackRenderer())
+        return renderers
+
+    def get_parsers(self):
+        parsers = super().get_parsers()
+        if msgpack is not None:
+            parsers.append(MessagePackParser())
+        return parsers
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['native_dates'] = getattr(getattr(self.request, 'accepted_renderer', None), 'native_dates', False)
+        return context
+
+
+def to_columns(items):
+    """
+    A list of representations as {'columns': [field names], 'rows': [[values], ...]}, keys are sent once.
+    """
+    columns = list(items[0]) if items else []
+    return {'columns': columns, 'rows': [[item[column] for column in columns] for item in items]}
+
+
+class ColumnarListMixin:
+    """
+    `?shape=columns` sends lists and pages as {"columns": [...], "rows": [[...], ...]} (see to_columns)
+    instead of one object per row, in any format. error responses keep their shape.
+    """
+    shape_query_param = 'shape'
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            isinstance(response, Response) and not response.exception
+            and request.query_params.get(self.shape_query_param) == 'columns'
+        ):
+            data = response.data
+            if isinstance(data, list):
+                response.data = to_columns(data)
+            elif isinstance(data, dict) and isinstance(data.get('results'), list):
+                response.data = {**data, 'results': to_columns(data['results'])}
+        return response
+
+
+class AsyncViewSetMixin:
+    """
+    Lets viewset actions be coroutines (DRF only dispatches sync handlers). the view is marked as a
+    coroutine function, so under ASGI it runs on the event loop instead of in a worker thread.
+    authentication, permissions and throttling, and any sync handler, still run in a worker thread.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        return markcoroutinefunction(super().as_view(actions, **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # APIView.dispatch, awaiting the handler
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
 
 
 # test 5
-class UserHyperLinkViewSet(ModelViewSet):
+class UserHyperLinkViewSet(
+    ColumnarListMixin, MessagePackViewSetMixin, StreamingListMixin, CachedListMixin,
+    SparseFieldsViewSetMixin, EagerLoadingViewSetMixin, ModelViewSet,
+):
     queryset = MyUser.objects.all()
     serializer_class = UserHyperLinkSerializer
+    pagination_class = UserCursorPagination
+    filter_backends = [OrderingFilter]
+    # cursor pagination needs a unique ordering
+    ordering_fields = ['id', 'username']
+    ordering = ['id']
+
+    @action(detail=True, url_path='friends-of-friends')
+    def friends_of_friends(self, request, pk=None):
+        return self.list_users(MyUser.objects.friends_of_friends(self.get_user_pk(pk)))
+
+    @action(detail=True, url_path='mutual-friends')
+    def mutual_friends(self, request, pk=None):
+        other_pk = request.query_params.get('with')
+        if not other_pk:
+            raise ValidationError({'with': 'This query parameter is required.'})
+        return self.list_users(MyUser.objects.mutual_friends(self.get_user_pk(pk), self.get_user_pk(other_pk)))
+
+    def get_user_pk(self, pk):
+        """
+        `pk` as an int, NotFound unless a user of the viewset queryset has it.
+        """
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound()
+        if not self.get_queryset().filter(pk=pk).exists():
+            raise NotFound()
+        return pk
+
+    def list_users(self, queryset):
+        """
+        Paginated list of a friends-graph queryset, each page is a single SQL query.
+        """
+        queryset = self.filter_queryset(self.get_serializer_class().setup_eager_loading(queryset, self.get_field_selection()))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class AsyncUserHyperLinkViewSet(
+    AsyncViewSetMixin, ColumnarListMixin, MessagePackViewSetMixin, SparseFieldsViewSetMixin,
+    EagerLoadingViewSetMixin, GenericViewSet,
+):
+    """
+    UserHyperLinkViewSet's list / retrieve / create / update / destroy written against the async
+    serializer API (ais_valid / asave / adata). cursor pagination still evaluates the page in a worker thread.
+    """
+    queryset = MyUser.objects.all()
+    serializer_class = UserHyperLinkSerializer
+    pagination_class = UserCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'username']
+    ordering = ['id']
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            return self.get_paginated_response(await self.get_serializer(page, many=True).adata())
+        return Response(await self.get_serializer(queryset, many=True).adata())
+
+    async def retrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(await self.get_serializer(instance).adata())
+
+    async def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        await serializer.ais_valid(raise_exception=True)
+        await serializer.asave()
+        data = await serializer.adata()
+        headers = {'Location': str(data['url'])} if 'url' in data else {}
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    async def update(self, request, *args, partial=False, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        await serializer.ais_valid(raise_exception=True)
+        await serializer.asave()
+        return Response(await serializer.adata())
+
+    async def partial_update(self, request, *args, **kwargs):
+        return await self.update(request, *args, partial=True, **kwargs)
+
+    async def destroy(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        await instance.adelete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserImportView(APIView):
+    """
+    Bulk user import: POST an NDJSON body, one UserSerializer object per line. lines are validated and
+    created in batches of USER_IMPORT_BATCH_SIZE, one transaction per batch, and the results stream back
+    as NDJSON (see profile_1/importing.py). `?skip=<line>` resumes after the last committed line,
+    `?verbose=1` also reports the id of every created user. admins only, it creates accounts with passwords.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        try:
+            skip = int(request.query_params.get('skip', 0))
+        except ValueError:
+            raise ValidationError({'skip': 'A valid integer is required.'})
+        return streaming_import_response(
+            request,
+            {'request': request, 'view': self},
+            get_import_batch_size(),
+            skip=skip,
+            verbose=request.query_params.get('verbose') in ('1', 'true'),
+        )
+
+
+class SerializerProfileView(APIView):
+    """
+    Per-hook call counts and latency percentiles collected by start_end_log
+    (needs SERIALIZER_PROFILE = True). DELETE resets the counters.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'enabled': profiling_enabled(),
+            'hooks': profile_report(),
+        })
+
+    def delete(self, request):
+        reset_profile()
+        return Response(status=204)